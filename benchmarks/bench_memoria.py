@@ -0,0 +1,69 @@
+#Benchmark de memoria: DataFrame combinado construido desde una lista de diccionarios (como antes)
+#frente al esquema tipado (categóricas y enteros nullable estrechos) que devuelve ahora el scraper.
+#Simula una liga completa: 20 clubes x 20 temporadas x ~30 jugadores con estadísticas.
+#Uso: python benchmarks/bench_memoria.py
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from transfermarkt_scraper import COMBINED_SCHEMA, apply_schema
+
+CLUBS = 20
+SEASONS = range(2005, 2025)
+PLAYERS = 30
+
+POSITIONS = ['Goalkeeper', 'Centre-Back', 'Left-Back', 'Right-Back', 'Defensive Midfield', 'Central Midfield',
+             'Attacking Midfield', 'Left Winger', 'Right Winger', 'Centre-Forward']
+NATIONALITIES = ['Spain', 'France', 'Brazil', 'Argentina', 'Germany', 'England', 'Portugal', 'Italy', 'Netherlands', 'Croatia']
+
+#Registros con los mismos tipos de Python que generaba el scraper antes del esquema tipado.
+def make_records(seed = 0):
+    rng = random.Random(seed)
+    maybe = lambda value: value if rng.random() > 0.1 else None
+    records = []
+    for club in range(CLUBS):
+        for season in SEASONS:
+            for player in range(PLAYERS):
+                records.append({'Season': str(season),
+                                'Number': maybe(rng.randint(1, 99)),
+                                'Player': f'Player {club}-{player}',
+                                'Position': rng.choice(POSITIONS),
+                                'Age': rng.randint(16, 40),
+                                'Nationality': rng.choice(NATIONALITIES),
+                                'Market Value': maybe(rng.choice([5e5, 1.2e6, 8e7, 1.5e7])),
+                                'Lineups': maybe(rng.randint(0, 38)),
+                                'Goals': maybe(rng.randint(0, 30)),
+                                'Assists': maybe(rng.randint(0, 20)),
+                                'Yellow Cards': maybe(rng.randint(0, 12)),
+                                'Second Card': None,
+                                'Red Cards': maybe(rng.randint(0, 2))})
+    return records
+
+def megabytes(df):
+    return df.memory_usage(deep = True).sum() / 1024 ** 2
+
+def time_groupby(df):
+    start = time.perf_counter()
+    df.groupby('Season', observed = True)['Market Value'].mean()
+    df.groupby(['Player', 'Season'], observed = True)[['Goals', 'Assists']].sum()
+    return time.perf_counter() - start
+
+def main():
+    records = make_records()
+    untyped = pd.DataFrame(records)
+    typed = apply_schema(untyped, COMBINED_SCHEMA)
+    
+    print(f'{len(typed)} filas')
+    print(f'Lista de diccionarios: {megabytes(untyped):.1f} MB, groupby {time_groupby(untyped) * 1000:.0f} ms')
+    print(f'Esquema tipado:        {megabytes(typed):.1f} MB, groupby {time_groupby(typed) * 1000:.0f} ms')
+    print(f'Memoria ahorrada: {100 * (1 - megabytes(typed) / megabytes(untyped)):.0f}%')
+    print()
+    print(pd.DataFrame({'antes (bytes)': untyped.memory_usage(deep = True), 'ahora (bytes)': typed.memory_usage(deep = True)}))
+
+if __name__ == '__main__':
+    main()
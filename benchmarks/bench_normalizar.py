@@ -0,0 +1,48 @@
+#Micro-benchmark: normalizar_valor celda a celda frente a normalizar_columna vectorizada.
+#Simula una liga completa: ~500 filas por página x 20 temporadas x 20 clubes, con las 9 columnas numéricas del scraper.
+#Uso: python benchmarks/bench_normalizar.py
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transfermarkt_scraper import normalizar_columna, normalizar_valor
+
+ROWS = 500 * 20 * 20
+REPEATS = 3
+
+#Genera textos con el formato de Transfermarkt que también entiende normalizar_valor (para comparar lo mismo).
+def make_columns(rows, seed = 0):
+    rng = random.Random(seed)
+    values = ['€80.00m', '€1.20m', '€500k', '€75k', '-', '']
+    columns = {'Market Value': [rng.choice(values) for _ in range(rows)],
+               'Number': [str(rng.randint(1, 99)) for _ in range(rows)],
+               'Age': [str(rng.randint(16, 40)) for _ in range(rows)]}
+    for name in ['Lineups', 'Goals', 'Assists', 'Yellow Cards', 'Second Card', 'Red Cards']:
+        columns[name] = [rng.choice(['-', '', str(rng.randint(0, 40))]) for _ in range(rows)]
+    return columns
+
+def best_of(function):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    columns = make_columns(ROWS)
+    cells = ROWS * len(columns)
+    
+    scalar = best_of(lambda: [[normalizar_valor(value) if value else None for value in values] for values in columns.values()])
+    vectorized = best_of(lambda: [normalizar_columna(values) for values in columns.values()])
+    
+    print(f'{cells} celdas')
+    print(f'normalizar_valor (celda a celda): {scalar:.3f} s ({cells / scalar:,.0f} celdas/s)')
+    print(f'normalizar_columna (vectorizada): {vectorized:.3f} s ({cells / vectorized:,.0f} celdas/s)')
+    print(f'Aceleración: x{scalar / vectorized:.1f}')
+
+if __name__ == '__main__':
+    main()
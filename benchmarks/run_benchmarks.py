@@ -0,0 +1,211 @@
+#Suite de benchmarks offline del scraper con páginas de Transfermarkt guardadas y un servidor local (benchmarks/server.py).
+#Mide el análisis de cada página (ms/página por backend), el rendimiento de normalizar_valor frente a normalizar_columna,
+#el tiempo de combinar una temporada, el arranque (importar el paquete y obtener la primera temporada en un proceso nuevo),
+#y de extremo a extremo las páginas/s y el pico de memoria (RSS) de scrape_transfermarkt_data con 1, 5 y 20 temporadas
+#y de scrape_league con varios clubes. Los de scrape_transfermarkt_data se repiten analizando cada página mientras se
+#descarga (stream = True); para que se note, el servidor puede enviar las páginas con un ancho de banda limitado (--bandwidth).
+#Los escenarios de extremo a extremo se ejecutan cada uno en un proceso nuevo para que el pico de RSS sea solo suyo.
+#El resultado se guarda en JSON (por defecto en benchmarks/results/) para poder comparar ejecuciones.
+#Uso: python benchmarks/run_benchmarks.py --latency 0.05 --rate-429 0.05 --bandwidth 200000
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  #Windows no tiene el módulo resource: el pico de RSS queda como null.
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import pandas as pd
+
+import transfermarkt_scraper
+from bench_normalizar import make_columns
+from server import FIXTURES_DIR, StandInServer
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+SEASON_COUNTS = (1, 5, 20)
+LAST_SEASON = 2024
+BATCH_CLUBS = [('real-madrid', '418'), ('fc-barcelona', '131'), ('atletico-madrid', '13'), ('fc-sevilla', '368'), ('fc-valencia', '1049')]
+BATCH_SEASONS = 5
+
+#Pico de memoria residente del proceso actual, en MB.
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024, 1)  #macOS lo da en bytes y Linux en KB.
+
+#Tiempo medio por llamada en milisegundos.
+def ms_per_call(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return round((time.perf_counter() - start) / repeats * 1000, 3)
+
+def read_fixtures(fixtures_dir):
+    with open(os.path.join(fixtures_dir, 'kader.html'), 'rb') as page:
+        kader = page.read()
+    with open(os.path.join(fixtures_dir, 'leistungsdaten.html'), 'rb') as page:
+        leistungsdaten = page.read()
+    return kader, leistungsdaten
+
+def bench_parse(fixtures_dir, repeats):
+    kader, leistungsdaten = read_fixtures(fixtures_dir)
+    results = {}
+    for backend in transfermarkt_scraper.PARSER_BACKENDS:
+        results[backend] = {
+            'marketvalue_ms_per_page': ms_per_call(lambda: transfermarkt_scraper.parse_marketvalue_page(kader, LAST_SEASON, backend), repeats),
+            'stats_ms_per_page': ms_per_call(lambda: transfermarkt_scraper.parse_stats_page(leistungsdaten, LAST_SEASON, backend), repeats)}
+    return results
+
+def bench_normalizar(rows):
+    columns = make_columns(rows)
+    cells = rows * len(columns)
+    
+    start = time.perf_counter()
+    for values in columns.values():
+        [transfermarkt_scraper.normalizar_valor(value) if value else None for value in values]
+    scalar = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for values in columns.values():
+        transfermarkt_scraper.normalizar_columna(values)
+    vectorized = time.perf_counter() - start
+    
+    return {'cells': cells,
+            'normalizar_valor_cells_per_s': round(cells / scalar),
+            'normalizar_columna_cells_per_s': round(cells / vectorized)}
+
+def bench_merge(fixtures_dir, repeats):
+    kader, leistungsdaten = read_fixtures(fixtures_dir)
+    marketvalue_df = transfermarkt_scraper.parse_marketvalue_page(kader, LAST_SEASON)
+    stats_df = transfermarkt_scraper.parse_stats_page(leistungsdaten, LAST_SEASON)
+    
+    #Además de una temporada suelta, combinamos 20 temporadas seguidas con combine_seasons.
+    season_frames = {str(season): transfermarkt_scraper.merge_season(marketvalue_df.assign(Season = str(season)),
+                                                           stats_df.assign(Season = str(season)))[0]
+                     for season in range(LAST_SEASON - 19, LAST_SEASON + 1)}
+    return {'merge_season_ms': ms_per_call(lambda: transfermarkt_scraper.merge_season(marketvalue_df, stats_df), repeats),
+            'combine_20_seasons_ms': ms_per_call(lambda: transfermarkt_scraper.combine_seasons(season_frames, list(season_frames)), repeats)}
+
+#Programa que mide el arranque en un proceso nuevo: lo que tarda en importarse transfermarkt_scraper, lo que tarda en
+#llegar la primera temporada desde el servidor local y qué módulos pesados se han cargado por el camino.
+STARTUP_SNIPPET = '''
+import json, sys, time
+start = time.perf_counter()
+import transfermarkt_scraper
+imported = time.perf_counter()
+transfermarkt_scraper.urls.MARKETVALUES_HOST = transfermarkt_scraper.urls.STATS_HOST = sys.argv[1]
+next(transfermarkt_scraper.iter_transfermarkt_seasons('real-madrid', '418', [2024]))
+first = time.perf_counter()
+print(json.dumps({'import_s': imported - start, 'first_season_s': first - start,
+                  'heavy_modules': [name for name in ('streamlit', 'plotly', 'bs4', 'lxml', 'fake_useragent') if name in sys.modules]}))
+'''
+
+def bench_startup(base_url, repeats):
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', STARTUP_SNIPPET, base_url], cwd = os.path.dirname(BENCH_DIR),
+                                capture_output = True, text = True, check = True)
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return {'import_ms': round(sorted(run['import_s'] for run in runs)[len(runs) // 2] * 1000, 1),
+            'first_season_ms': round(sorted(run['first_season_s'] for run in runs)[len(runs) // 2] * 1000, 1),
+            'heavy_modules': runs[-1]['heavy_modules']}
+
+#Escenarios de extremo a extremo: se ejecutan dentro de un proceso hijo (ver run_child).
+def child_end_to_end(seasons, stream = False):
+    start = time.perf_counter()
+    combined_data = transfermarkt_scraper.scrape_transfermarkt_data('real-madrid', '418', range(LAST_SEASON - seasons + 1, LAST_SEASON + 1),
+                                                                    stream = stream)
+    elapsed = time.perf_counter() - start
+    return {'seasons': seasons, 'stream': stream, 'pages': 2 * seasons, 'rows': len(combined_data), 'seconds': round(elapsed, 3),
+            'pages_per_s': round(2 * seasons / elapsed, 2), 'peak_rss_mb': peak_rss_mb()}
+
+def child_batch(seasons, stream = False):
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        start = time.perf_counter()
+        combined_data = transfermarkt_scraper.scrape_league(BATCH_CLUBS, range(LAST_SEASON - seasons + 1, LAST_SEASON + 1), checkpoint_dir)
+        elapsed = time.perf_counter() - start
+    pages = 2 * seasons * len(BATCH_CLUBS)
+    return {'clubs': len(BATCH_CLUBS), 'seasons': seasons, 'pages': pages, 'rows': len(combined_data),
+            'seconds': round(elapsed, 3), 'pages_per_s': round(pages / elapsed, 2), 'peak_rss_mb': peak_rss_mb()}
+
+#Lanza un escenario en un proceso nuevo contra el servidor local y devuelve su resultado.
+def run_child(scenario, base_url, seasons, stream = False):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', scenario, '--base-url', base_url,
+                             '--seasons', str(seasons)] + (['--stream'] if stream else []), capture_output = True, text = True,
+                            check = True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd = BENCH_DIR, capture_output = True, text = True,
+                              check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmarks offline del scraper de Transfermarkt.')
+    parser.add_argument('--latency', type = float, default = 0.05, help = 'segundos de latencia del servidor local por petición')
+    parser.add_argument('--rate-429', type = float, default = 0.0, help = 'proporción de respuestas 429 del servidor local')
+    parser.add_argument('--retry-after', type = int, default = 0, help = 'cabecera Retry-After de los 429')
+    parser.add_argument('--rate-limit', type = float, help = 'peticiones por segundo y host que acepta el servidor local')
+    parser.add_argument('--bandwidth', type = float, help = 'bytes por segundo con los que el servidor local envía cada página')
+    parser.add_argument('--fixtures', default = FIXTURES_DIR, help = 'directorio con kader.html y leistungsdaten.html')
+    parser.add_argument('--repeats', type = int, default = 50, help = 'repeticiones de los benchmarks de análisis y merge')
+    parser.add_argument('--normalizar-rows', type = int, default = 50000)
+    parser.add_argument('--out', help = 'fichero JSON de resultados (por defecto benchmarks/results/<fecha>.json)')
+    parser.add_argument('--child', choices = ['end_to_end', 'batch'], help = argparse.SUPPRESS)
+    parser.add_argument('--base-url', help = argparse.SUPPRESS)
+    parser.add_argument('--seasons', type = int, help = argparse.SUPPRESS)
+    parser.add_argument('--stream', action = 'store_true', help = argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    #Modo proceso hijo: apuntamos el scraper al servidor local, ejecutamos el escenario e imprimimos su resultado.
+    if args.child:
+        transfermarkt_scraper.urls.MARKETVALUES_HOST = transfermarkt_scraper.urls.STATS_HOST = args.base_url
+        scenario = child_end_to_end if args.child == 'end_to_end' else child_batch
+        print(json.dumps(scenario(args.seasons, args.stream)))
+        return
+    
+    results = {'parse': bench_parse(args.fixtures, args.repeats),
+               'normalizar': bench_normalizar(args.normalizar_rows),
+               'merge': bench_merge(args.fixtures, args.repeats)}
+    
+    with StandInServer(args.fixtures, latency = args.latency, rate_429 = args.rate_429, retry_after = args.retry_after,
+                       rate_limit = args.rate_limit, bandwidth = args.bandwidth) as server:
+        results['startup'] = bench_startup(server.base_url, 5)
+        results['end_to_end'] = [run_child('end_to_end', server.base_url, seasons) for seasons in SEASON_COUNTS]
+        results['end_to_end_stream'] = [run_child('end_to_end', server.base_url, seasons, True) for seasons in SEASON_COUNTS]
+        results['batch'] = run_child('batch', server.base_url, BATCH_SEASONS)
+        results['server'] = dict(server.counters)
+    
+    report = {'timestamp': datetime.now().isoformat(timespec = 'seconds'),
+              'git_commit': git_commit(),
+              'python': platform.python_version(),
+              'pandas': pd.__version__,
+              'platform': platform.platform(),
+              'config': {'latency': args.latency, 'rate_429': args.rate_429, 'retry_after': args.retry_after,
+                         'rate_limit': args.rate_limit, 'bandwidth': args.bandwidth,
+                         'fixtures': os.path.abspath(args.fixtures), 'repeats': args.repeats,
+                         'max_workers': transfermarkt_scraper.MAX_WORKERS, 'parser_backend': transfermarkt_scraper.PARSER_BACKEND},
+              'results': results}
+    
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok = True)
+    with open(out, 'w', encoding = 'utf-8') as out_file:
+        json.dump(report, out_file, indent = 2)
+    print(json.dumps(results, indent = 2))
+    print(f'Resultados guardados en {out}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#Servidor HTTP local que sustituye a Transfermarkt en los benchmarks.
+#Sirve las páginas guardadas en benchmarks/fixtures (kader.html para los valores de mercado y leistungsdaten.html
+#para las estadísticas) para cualquier club y temporada, con una latencia configurable por petición y una
+#proporción configurable de respuestas 429 (con cabecera Retry-After). Responde 304 a los GET condicionales.
+#Con rate_limit hace cumplir un límite de peticiones por segundo y por host (cabecera Host), como Transfermarkt:
+#las peticiones que lo superan en el último segundo reciben un 429.
+#Con bandwidth el cuerpo se envía por trozos a ese ritmo (bytes/s por respuesta), como una descarga real que tarda en llegar.
+#Uso directo: python benchmarks/server.py --port 8000 --latency 0.1 --rate-429 0.05 --rate-limit 10 --bandwidth 200000
+import argparse
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+#Qué página guardada se sirve según la ruta pedida.
+ROUTES = {'/kader/': 'kader.html', '/leistungsdaten/': 'leistungsdaten.html'}
+
+#Bytes de cada escritura cuando se limita el ancho de banda.
+SEND_CHUNK_SIZE = 4096
+
+class StandInServer:
+    
+    def __init__(self, fixtures_dir = FIXTURES_DIR, host = '127.0.0.1', port = 0, latency = 0.0, rate_429 = 0.0,
+                 retry_after = 0, seed = 0, rate_limit = None, bandwidth = None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent = {}  #Host -> instantes de las peticiones aceptadas en el último segundo.
+        self.counters = {'requests': 0, 'served': 0, 'not_modified': 0, 'throttled': 0, 'rate_limited': 0, 'not_found': 0,
+                         'bytes': 0}
+        
+        self.pages = {}
+        for route, name in ROUTES.items():
+            with open(os.path.join(fixtures_dir, name), 'rb') as page:
+                self.set_page(route, page.read())
+        
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+    
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+    
+    def start(self):
+        self.thread = threading.Thread(target = self.httpd.serve_forever, daemon = True)
+        self.thread.start()
+        return self.base_url
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    #Sustituye el cuerpo que se sirve en una ruta de ROUTES (por ejemplo, por una página de bloqueo en los tests).
+    def set_page(self, route, body):
+        with self.lock:
+            self.pages[route] = (body, '"%s"' % hashlib.sha1(body).hexdigest())
+    
+    def count(self, name, amount = 1):
+        with self.lock:
+            self.counters[name] += amount
+    
+    #Decide (de forma reproducible con la semilla) si esta petición se responde con un 429.
+    def throttle(self):
+        with self.lock:
+            return self.random.random() < self.rate_429
+    
+    #Ventana deslizante de un segundo por host: True si la petición supera rate_limit y hay que rechazarla.
+    def over_limit(self, host):
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            recent = self.recent.setdefault(host, deque())
+            while recent and now - recent[0] >= 1.0:
+                recent.popleft()
+            if len(recent) >= self.rate_limit:
+                return True
+            recent.append(now)
+            return False
+    
+    def _handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_GET(self):
+                server.count('requests')
+                if server.latency:
+                    time.sleep(server.latency)
+                
+                page = next((page for route, page in server.pages.items() if route in self.path), None)
+                if page is None:
+                    server.count('not_found')
+                    return self.reply(404)
+                if server.over_limit(self.headers.get('Host')):
+                    server.count('rate_limited')
+                    return self.reply(429, headers = {'Retry-After': str(server.retry_after)})
+                if server.throttle():
+                    server.count('throttled')
+                    return self.reply(429, headers = {'Retry-After': str(server.retry_after)})
+                
+                body, etag = page
+                if self.headers.get('If-None-Match') == etag:
+                    server.count('not_modified')
+                    return self.reply(304, headers = {'ETag': etag})
+                server.count('served')
+                server.count('bytes', len(body))
+                self.reply(200, body, {'ETag': etag, 'Content-Type': 'text/html; charset=utf-8'})
+            
+            def reply(self, status, body = b'', headers = None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body and server.bandwidth:
+                    for start in range(0, len(body), SEND_CHUNK_SIZE):
+                        self.wfile.write(body[start:start + SEND_CHUNK_SIZE])
+                        self.wfile.flush()
+                        time.sleep(min(SEND_CHUNK_SIZE, len(body) - start) / server.bandwidth)
+                elif body:
+                    self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Servidor local con páginas de Transfermarkt guardadas.')
+    parser.add_argument('--port', type = int, default = 8000)
+    parser.add_argument('--latency', type = float, default = 0.0, help = 'segundos de espera por petición')
+    parser.add_argument('--rate-429', type = float, default = 0.0, help = 'proporción de respuestas 429 (0-1)')
+    parser.add_argument('--retry-after', type = int, default = 0, help = 'valor de la cabecera Retry-After de los 429')
+    parser.add_argument('--rate-limit', type = float, help = 'peticiones por segundo y host a partir de las que se responde 429')
+    parser.add_argument('--bandwidth', type = float, help = 'bytes por segundo con los que se envía cada respuesta')
+    parser.add_argument('--fixtures', default = FIXTURES_DIR)
+    args = parser.parse_args()
+    
+    server = StandInServer(args.fixtures, port = args.port, latency = args.latency, rate_429 = args.rate_429,
+                           retry_after = args.retry_after, rate_limit = args.rate_limit, bandwidth = args.bandwidth)
+    print(f'Sirviendo {args.fixtures} en {server.base_url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+#Fixtures compartidas de los tests: el servidor local de los benchmarks hace de Transfermarkt.
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from server import StandInServer
+from transfermarkt_scraper import urls
+
+#Página de bloqueo que Transfermarkt devuelve con un 200 (sin table.items).
+BLOCK_PAGE = b'<html><body><h1>Please verify you are human</h1></body></html>'
+
+#Servidor local con las páginas guardadas de benchmarks/fixtures, al que apuntan los constructores de URLs.
+@pytest.fixture
+def stand_in(monkeypatch):
+    with StandInServer() as server:
+        monkeypatch.setattr(urls, 'MARKETVALUES_HOST', server.base_url)
+        monkeypatch.setattr(urls, 'STATS_HOST', server.base_url)
+        yield server
@@ -0,0 +1,63 @@
+import time
+
+from conftest import BLOCK_PAGE
+from transfermarkt_scraper import Fetcher, ResponseCache, scrape_transfermarkt_data
+from transfermarkt_scraper.urls import get_team_season_marketvalues_url
+
+
+def test_fresh_entry_is_served_without_network(stand_in, tmp_path):
+    url = get_team_season_marketvalues_url('real-madrid', '418', 2015)
+    with Fetcher(cache = ResponseCache(str(tmp_path)), rate_limiter = False) as fetcher:
+        first = fetcher.get(url, ttl = 3600)
+        second = fetcher.get(url, ttl = 3600)
+    assert first.status_code == 200 and not getattr(first, 'from_cache', False)
+    assert second.from_cache and second.content == first.content
+    assert stand_in.counters['requests'] == 1
+
+#Una entrada caducada se revalida con If-None-Match y, con un 304, se sirve el cuerpo guardado.
+def test_stale_entry_is_revalidated_with_etag(stand_in, tmp_path):
+    url = get_team_season_marketvalues_url('real-madrid', '418', 2015)
+    with Fetcher(cache = ResponseCache(str(tmp_path)), rate_limiter = False) as fetcher:
+        first = fetcher.get(url, ttl = 0)
+        second = fetcher.get(url, ttl = 3600)
+        third = fetcher.get(url, ttl = 3600)
+    assert second.from_cache and second.content == first.content
+    assert third.from_cache
+    assert stand_in.counters['served'] == 1
+    assert stand_in.counters['not_modified'] == 1
+    assert stand_in.counters['requests'] == 2
+
+#Al superar max_bytes se elimina la entrada usada hace más tiempo.
+def test_lru_eviction_keeps_recently_used_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes = 250)
+    for url in ('a', 'b'):
+        cache.store(url, b'x' * 100, {}, 3600)
+        time.sleep(0.01)
+    cache.get('a')
+    time.sleep(0.01)
+    cache.store('c', b'x' * 100, {}, 3600)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.total_bytes == 200
+
+def test_invalidate_removes_entry(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.store('a', b'x' * 100, {}, 3600)
+    cache.invalidate('a')
+    assert cache.get('a') is None
+    assert cache.total_bytes == 0
+
+#Una página de bloqueo servida con un 200 no se queda en la caché: al volver la página real se descarga de nuevo.
+def test_blocked_page_is_not_served_from_cache(stand_in, tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    real_page = stand_in.pages['/kader/'][0]
+    
+    stand_in.set_page('/kader/', BLOCK_PAGE)
+    assert scrape_transfermarkt_data('real-madrid', '418', [2015], cache = cache, rate_limiter = False).empty
+    
+    stand_in.set_page('/kader/', real_page)
+    assert len(scrape_transfermarkt_data('real-madrid', '418', [2015], cache = cache, rate_limiter = False)) > 0
+    
+    requests_before = stand_in.counters['requests']
+    assert len(scrape_transfermarkt_data('real-madrid', '418', [2015], cache = cache, rate_limiter = False)) > 0
+    assert stand_in.counters['requests'] == requests_before
@@ -0,0 +1,27 @@
+from conftest import BLOCK_PAGE
+from transfermarkt_scraper import ResponseCache, scrape_league
+
+
+#Una página de bloqueo no deja un punto de control vacío: al volver la página real, la temporada se scrapea de nuevo.
+def test_blocked_season_is_retried_on_next_run(stand_in, tmp_path):
+    cache = ResponseCache(str(tmp_path / 'http'))
+    checkpoint_dir = str(tmp_path / 'checkpoints')
+    real_page = stand_in.pages['/kader/'][0]
+    
+    stand_in.set_page('/kader/', BLOCK_PAGE)
+    blocked = scrape_league([('real-madrid', '418')], [2015], checkpoint_dir, cache = cache, parse_processes = 0,
+                            rate_limiter = False)
+    assert blocked.empty
+    
+    stand_in.set_page('/kader/', real_page)
+    league_data = scrape_league([('real-madrid', '418')], [2015], checkpoint_dir, cache = cache, parse_processes = 0,
+                                rate_limiter = False)
+    assert len(league_data) > 0
+    assert set(league_data['Code']) == {'418'}
+
+#clubs y seasons pueden ser generadores.
+def test_clubs_and_seasons_can_be_generators(stand_in, tmp_path):
+    clubs = (club for club in [('real-madrid', '418'), ('fc-barcelona', '131')])
+    seasons = map(int, ['2015'])
+    league_data = scrape_league(clubs, seasons, str(tmp_path), parse_processes = 0, rate_limiter = False)
+    assert list(league_data['Code'].unique()) == ['418', '131']
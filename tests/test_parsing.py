@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from conftest import ROOT
+from transfermarkt_scraper import SeasonStore, parse_marketvalue_page, parse_stats_page, parsing
+
+FIXTURES_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as page:
+        return page.read()
+
+#Con el mismo HTML de la tabla que el DataFrame guardado, la página no se vuelve a analizar.
+@pytest.mark.parametrize('parser, name', [(parse_marketvalue_page, 'kader.html'), (parse_stats_page, 'leistungsdaten.html')])
+def test_unchanged_table_html_is_not_parsed_again(parser, name, tmp_path, monkeypatch):
+    content = read_fixture(name)
+    store = SeasonStore(str(tmp_path))
+    store.save('418', 2015, 'page', parser(content, 2015))
+    previous = store.load('418', 2015, 'page')
+    
+    def fail(*args):
+        raise AssertionError('la página se ha vuelto a analizar')
+    monkeypatch.setattr(parsing, 'extract_columns', fail)
+    assert parser(content, 2015, previous = previous) is previous
+    
+    #El HTML de fuera de las tablas (anuncios, tokens...) no cuenta como cambio.
+    assert parser(b'<div>anuncio</div>' + content, 2015, previous = previous) is previous
+
+#Si cambia el HTML de la tabla pero no sus celdas, se analiza y se reutiliza previous sin normalizar.
+def test_changed_markup_with_same_cells_reuses_previous():
+    content = read_fixture('kader.html')
+    previous = parse_marketvalue_page(content, 2015)
+    restyled = content.replace(b'class="items"', b'class="items" data-token="123"', 1)
+    assert parse_marketvalue_page(restyled, 2015, previous = previous) is previous
@@ -0,0 +1,94 @@
+import socket
+import threading
+import time
+
+import pytest
+import requests
+
+from transfermarkt_scraper import RATE_INITIAL, Fetcher, RateLimiter
+from transfermarkt_scraper.urls import get_team_season_marketvalues_url, get_team_season_stats_url
+
+
+def host_state(limiter, url):
+    return limiter.for_url(url).snapshot()
+
+#Con 429 y Retry-After el Fetcher espera lo indicado y el limitador recorta ritmo y concurrencia; al volver las
+#respuestas correctas, el ritmo sube otra vez de forma aditiva.
+def test_429_with_retry_after_backs_off(stand_in):
+    stand_in.rate_429 = 1.0
+    stand_in.retry_after = 1
+    url = get_team_season_marketvalues_url('real-madrid', '418', 2015)
+    limiter = RateLimiter()
+    with Fetcher(rate_limiter = limiter, max_retries = 1) as fetcher:
+        start = time.monotonic()
+        response = fetcher.fetch(url)
+        elapsed = time.monotonic() - start
+        assert response.status_code == 429 and response.retries == 1
+        assert elapsed >= 1.0
+        
+        blocked = host_state(limiter, url)
+        assert blocked['blocked'] == 2 and blocked['decreases'] == 2
+        assert blocked['rate'] == RATE_INITIAL * 0.25
+        assert not blocked['slow_start']
+        
+        stand_in.rate_429 = 0.0
+        for _ in range(3):
+            assert fetcher.fetch(url).status_code == 200
+    recovered = host_state(limiter, url)
+    assert blocked['rate'] < recovered['rate'] < blocked['rate'] + 3
+    assert recovered['in_flight'] == 0
+
+#Con stream = True el hueco de concurrencia se mantiene hasta que se cierra el cuerpo, no al llegar las cabeceras.
+def test_concurrency_cap_holds_while_streamed_body_is_open(stand_in):
+    limiter = RateLimiter(rate = 50, concurrency = 1, max_concurrency = 1)
+    first_url = get_team_season_marketvalues_url('real-madrid', '418', 2015)
+    second_url = get_team_season_marketvalues_url('real-madrid', '418', 2016)
+    with Fetcher(rate_limiter = limiter) as fetcher:
+        response, body = fetcher.get_stream(first_url)
+        assert response.status_code == 200
+        assert host_state(limiter, first_url)['in_flight'] == 1
+        
+        second = {}
+        waiting = threading.Thread(target = lambda: second.update(zip(('response', 'body'), fetcher.get_stream(second_url))))
+        waiting.start()
+        waiting.join(0.3)
+        assert waiting.is_alive()
+        
+        assert b''.join(body)
+        waiting.join(5)
+        assert not waiting.is_alive()
+        second['body'].close()
+    assert host_state(limiter, first_url)['in_flight'] == 0
+
+#El hueco se devuelve aunque el cuerpo no se lea entero, y también cuando la petición falla.
+def test_in_flight_returns_to_zero_after_close_and_errors(stand_in):
+    limiter = RateLimiter()
+    url = get_team_season_stats_url('real-madrid', '418', 2015)
+    with Fetcher(rate_limiter = limiter) as fetcher:
+        _, body = fetcher.get_stream(url, chunk_size = 1024)
+        next(iter(body))
+        body.close()
+        body.close()
+        assert host_state(limiter, url)['in_flight'] == 0
+        assert host_state(limiter, url)['requests'] == 1
+    
+    with socket.socket() as free:
+        free.bind(('127.0.0.1', 0))
+        closed_url = f'http://127.0.0.1:{free.getsockname()[1]}/kader/'
+    with Fetcher(rate_limiter = limiter, max_retries = 0) as fetcher:
+        with pytest.raises(requests.ConnectionError):
+            fetcher.get_stream(closed_url)
+    state = host_state(limiter, closed_url)
+    assert state['in_flight'] == 0 and state['blocked'] == 1
+
+def test_snapshot_since_counts_only_new_requests(stand_in):
+    limiter = RateLimiter()
+    url = get_team_season_marketvalues_url('real-madrid', '418', 2015)
+    with Fetcher(rate_limiter = limiter) as fetcher:
+        fetcher.fetch(url)
+        baseline = limiter.snapshot()
+        fetcher.fetch(url)
+        fetcher.fetch(url)
+    host = next(iter(baseline))
+    assert limiter.snapshot()[host]['requests'] == 3
+    assert limiter.snapshot_since(baseline)[host]['requests'] == 2
@@ -0,0 +1,32 @@
+import glob
+import os
+
+from conftest import BLOCK_PAGE
+from transfermarkt_scraper import ScrapeMetrics, SeasonStore, scrape_transfermarkt_data
+
+
+#Si una página caducada del almacén no se puede actualizar (aquí, por un bloqueo), la temporada sale con la tabla
+#guardada y la página sigue caducada para volver a intentarlo la próxima vez.
+def test_stale_page_is_used_when_refresh_fails(stand_in, tmp_path):
+    store = SeasonStore(str(tmp_path))
+    fresh = scrape_transfermarkt_data('real-madrid', '418', [2015], store = store, rate_limiter = False)
+    assert len(fresh) > 0
+    for path in glob.glob(os.path.join(str(tmp_path), '**', '*.parquet'), recursive = True):
+        os.utime(path, (0, 0))
+    
+    stand_in.set_page('/kader/', BLOCK_PAGE)
+    messages = []
+    metrics = ScrapeMetrics()
+    stale = scrape_transfermarkt_data('real-madrid', '418', [2015], display = messages.append, store = store, metrics = metrics,
+                                      rate_limiter = False)
+    assert len(stale) == len(fresh)
+    assert metrics.counters['pages_stale'] == 1
+    assert any('se usan los datos guardados' in message for message in messages)
+    assert store.age('418', 2015, 'marketvalue') > 3600
+    assert store.age('418', 2015, 'stats') < 3600
+
+#seasons puede ser un generador (se recorre varias veces por dentro).
+def test_seasons_can_be_a_generator(stand_in):
+    seasons = (season for season in (2014, 2015))
+    combined_data = scrape_transfermarkt_data('real-madrid', '418', seasons, rate_limiter = False)
+    assert list(combined_data['Season'].unique()) == ['2014', '2015']
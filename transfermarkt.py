@@ -1,189 +1,184 @@
 import streamlit as st
 import pandas as pd
-import requests
-from fake_useragent import UserAgent
-from bs4 import BeautifulSoup
-import plotly.express as px
-
-
-
-#Función para normalizar tanto los valores de mercado como las estadísticas.
-def normalizar_valor(valor):
-    if not valor or valor == '-':
-        return None
-    valor = valor.replace('€', '').strip()  #Eliminar el símbolo de €.
-    if 'm' in valor:
-        return float(valor.replace('m', ''))*1e6  #Convertir la 'm' a millones.
-    elif 'k' in valor:
-        return float(valor.replace('k', ''))*1e3  #Convertir la 'k' a miles.
-    else:
-        return int(valor)  #En otro caso convertimos el valor a entero.
+import time
 
-#Genera la URL para los valores de mercado de un equipo y temporada específicos en Transfermarkt.
-def get_team_season_marketvalues_url(team, code, season):
-    return f'https://www.transfermarkt.co.uk/{team}/kader/verein/{code}/plus/0/galerie/0?saison_id={season}'
+from transfermarkt_scraper import (DUCKDB_AVAILABLE, AnalyticsStore, DashboardAggregates, ResponseCache, ScrapeMetrics,
+                                   SeasonFrameCache, SeasonStore, combine_seasons, iter_transfermarkt_seasons)
 
-#Genera la URL para las estadísticas generales de un equipo y temporada específicos en Transfermarkt.
-def get_team_season_stats_url(team, code, season):
-    return f'https://www.transfermarkt.es/{team}/leistungsdaten/verein/{code}/plus/1?reldata=%26{season}'
+#Funciones que este módulo ofrecía antes de separar el núcleo de scraping en transfermarkt_scraper. Se siguen exportando
+#desde aquí para no romper a quien hace `from transfermarkt import scrape_transfermarkt_data`.
+from transfermarkt_scraper import (get_team_season_marketvalues_url, get_team_season_stats_url, normalizar_valor,
+                                   scrape_transfermarkt_data)
 
-#Función de scraping genérica para manejar varias temporadas o dos temporadas específicas.
-def scrape_transfermarkt_data(team, code, seasons, display = None):
-    
-    #Definimos las listas donde almacenaremos los datos respectivos.
-    marketvalue_data = []
-    stats_data = []
-    
-    #Cabecera que incluyen un agente de usuario aleatorio para evitar bloqueos.
-    headers = {'User-Agent': UserAgent().random}
 
-    for season in seasons:
-        
-        #Scrapeo de VALORES DE MERCADO:
-        
-        #Genera la URL para la temporada que estamos scrapeando.
-        marketvalue_url = get_team_season_marketvalues_url(team, code, season)
-        #Realiza la solicitud HTTP.
-        marketvalue_request = requests.get(marketvalue_url, headers = headers)
-        
-        #Control de errores.
-        if marketvalue_request.status_code != 200:
-            if display:
-                 display(f'Error al descargar valores de mercado para la temporada {season}: {marketvalue_request.status_code}')
-            continue  
-        
-        #Analizamos el contenido de la página con BeautifulSoup.
-        marketvalue_soup = BeautifulSoup(marketvalue_request.content, 'html.parser')
-        
-        #Seleccionamos todas las filas de la tabla y las vamos iterando.
-        rows = marketvalue_soup.find_all('tr', class_ = ['odd', 'even'])
-        for row in rows:
-            
-            #Extrae el número de jugador.
-            number = row.select('div.rn_nummer')
-            number = normalizar_valor(number[0].text.strip()) if number else None
-            
-            #Extrae el nombre del jugador.
-            player = row.select('td.hauptlink')
-            player = player[0].text.strip() if player else None
-            
-            #Extrae la posición del jugador.
-            position_cell = row.select('td')[1]  #Sacamos la segunda columna de la tabla (Nombre y Posición).
-            position = None
-            if position_cell:
-                position_text = position_cell.text.strip()  #Sacamos el texto y eliminamos los espacios en blanco.
-                position = position_text.split()[-1]  #Dividimos el texto por espacios ([Nombre, Posición]) y nos quedamos con la última palabra.
-            
-            #Extrae la edad del jugador.
-            age = row.select('td.zentriert')
-            age = normalizar_valor(age[1].text.strip()) if age else None
-            
-            #Extrae la nacionalidad del jugador.
-            nationality = row.select('img.flaggenrahmen')
-            nationality = nationality[0]['title'] if nationality else None
-            
-            #Extrae el valor de mercado del jugador.
-            market_value = row.select('td.rechts.hauptlink')
-            market_value = normalizar_valor(market_value[0].text.strip()) if market_value else None
-            
-            #Agrega la información al conjunto de datos.
-            marketvalue_data.append({
-                'Season': str(season),   #Queremos que las temporadas sean una variable categórica para manejarlas mejor más adelante.
-                'Number': number,
-                'Player': player,
-                'Position': position,
-                'Age': age,
-                'Nationality': nationality,
-                'Market Value': market_value
-            })
-        
-        #Muestra el progreso por pantalla en la aplicación de Streamlit.  
-        if display:
-            display(f'Valores de mercado de la temporada {season} completados.')
 
+### APP STREAMLIT ###
 
+#Caché de respuestas compartida por todas las sesiones de la aplicación (Streamlit la crea una sola vez).
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+#Almacén local de temporadas ya analizadas, compartido igual que la caché.
+@st.cache_resource
+def get_season_store():
+    return SeasonStore()
+
+#Caché en memoria de temporadas ya combinadas, compartida por las sesiones y por los dos modos de la aplicación.
+@st.cache_resource
+def get_season_cache():
+    return SeasonFrameCache()
+
+#Almacén analítico con todo lo scrapeado (de todos los equipos), que se consulta en el modo sin red.
+@st.cache_resource
+def get_analytics_store():
+    return AnalyticsStore()
+
+#Scrapea las temporadas indicadas mostrando la tabla a medida que se completa cada temporada.
+#Las temporadas que ya están en la caché en memoria no se vuelven a pedir al scraper.
+#Devuelve el mismo DataFrame que scrape_transfermarkt_data, que también se guarda en el almacén analítico.
+def scrape_with_live_table(team, code, seasons, display, metrics = None):
+    season_cache = get_season_cache()
+    table_placeholder = st.empty()
+    season_frames = {}
+    
+    missing = []
+    for season in dict.fromkeys(seasons):
+        season_data = season_cache.get(team, code, season)
+        if season_data is None:
+            missing.append(season)
+        else:
+            season_frames[str(season)] = season_data
+    if season_frames:
+        display(f'{len(season_frames)} temporadas recuperadas de la memoria, {len(missing)} pendientes.')
+        table_placeholder.dataframe(combine_seasons(season_frames, seasons))
+    if metrics is not None:
+        metrics.count('memory_hits', len(season_frames))
+    
+    #Cada página se analiza mientras se descarga (stream = True), así cada temporada llega antes.
+    for season_data in iter_transfermarkt_seasons(team, code, missing, display, cache = get_response_cache(), store = get_season_store(),
+                                                  metrics = metrics, stream = True):
+        if season_data.empty:
+            continue
+        season_cache.put(team, code, season_data['Season'].iat[0], season_data)
+        season_frames[season_data['Season'].iat[0]] = season_data
+        table_placeholder.dataframe(combine_seasons(season_frames, seasons))
+    
+    #La tabla definitiva se muestra después junto al mensaje de éxito.
+    table_placeholder.empty()
+    combined_data = combine_seasons(season_frames, seasons)
+    if not combined_data.empty:
+        get_analytics_store().write(combined_data, team, code)
+    return combined_data
 
-        #Scrapeo de ESTADÍSTICAS:
+#Panel desplegable con las métricas de rendimiento del último scraping y de los gráficos, con descarga en JSON y CSV.
+def show_performance_panel(metrics):
+    with st.expander('Rendimiento'):
+        summary = metrics.summary()
+        stages = metrics.stage_totals()
         
-        #Genera la URL para la temporada que estamos scrapeando.
-        stats_url = get_team_season_stats_url(team, code, season)
-        #Realiza la solicitud HTTP.
-        stats_request = requests.get(stats_url, headers = headers)
+        columns = st.columns(4)
+        columns[0].metric('Tiempo total', f'{summary["wall_time"] or 0:.2f} s')
+        columns[1].metric('Descargado', f'{summary["bytes_downloaded"] / 1024:.0f} KB')
+        columns[2].metric('Páginas (caché)', f'{summary["pages"]} ({summary["cache_hits"]})')
+        columns[3].metric('Reintentos', summary['retries'])
         
-        #Control de errores.
-        if stats_request.status_code != 200:
-            if display:
-                 display(f'Error al descargar estadísticas para la temporada {season}: {stats_request.status_code}')
-            continue  
+        #Tiempo acumulado de cada etapa (las descargas y los análisis en paralelo suman el tiempo de todos los hilos).
+        st.dataframe(pd.DataFrame({'Etapa': list(stages), 'Segundos': list(stages.values())}))
+        st.dataframe(metrics.seasons_frame())
         
-        #Analizamos el contenido de la página con BeautifulSoup.
-        stats_soup = BeautifulSoup(stats_request.content, 'html.parser')
+        #Ritmo final del limitador de cada host (peticiones/s), peticiones simultáneas y bloqueos recibidos.
+        if metrics.rate_limits:
+            st.dataframe(pd.DataFrame(metrics.rate_limits).T)
+        st.json(summary)
         
-        #Seleccionamos todas las filas de la tabla y las vamos iterando.
-        rows = stats_soup.find_all('tr', class_ = ['odd', 'even'])
-        for row in rows:
-            
-            zentriert = row.select('td.zentriert')
-            
-            #Verifica si la fila contiene 'No ha sido alineado esta temporada' o 'No ha estado en la plantilla esta temporada'.
-            if any(cell.text.strip() in ['No ha sido alineado esta temporada', 'No ha estado en la plantilla esta temporada'] for cell in zentriert):
-                continue
-            
-            #Extrae el nombre del jugador.
-            player = row.select_one('td.hauptlink a[title]')
-            player = player.text.strip() if player else None
-            
-            #Extrae las titularidades del jugador.
-            lineups = zentriert[4].text.strip() 
-            lineups = normalizar_valor(lineups) if lineups else None
-            
-            #Extrae los goles del jugador.
-            goals = zentriert[5].text.strip()
-            goals = normalizar_valor(goals) if goals else None
-            
-            #Extrae las asistencias del jugador.
-            assists = zentriert[6].text.strip()
-            assists = normalizar_valor(assists)if assists else None
-            
-            #Extrae las tarjetas amarillas del jugador.
-            yellow_cards = zentriert[7].text.strip()
-            yellow_cards = normalizar_valor(yellow_cards) if yellow_cards else None
-            
-            #Extrae las segundas tarjetas amarilla del jugador.
-            second_card = zentriert[8].text.strip() 
-            second_card = normalizar_valor(second_card) if second_card else None
-            
-            #Extrae las tarjetas rojas del jugador.
-            red_cards = zentriert[9].text.strip()
-            red_cards = normalizar_valor(red_cards) if red_cards else None
-            
-            #Agrega la información al conjunto de datos.
-            stats_data.append({
-                'Season': str(season),
-                'Player': player,
-                'Lineups': lineups,
-                'Goals': goals,
-                'Assists': assists,
-                'Yellow Cards': yellow_cards,
-                'Second Card' : second_card,
-                'Red Cards': red_cards
-            })
-            
-        #Muestra el progreso en pantalla de la aplicación en Streamlit.
-        if display:
-            display(f'Estadísticas de la temporada {season} completadas.')
+        st.download_button('Descargar métricas (JSON)', metrics.to_json(), file_name = 'metrics.json', mime = 'application/json')
+        st.download_button('Descargar métricas (CSV)', metrics.to_csv(), file_name = 'metrics.csv', mime = 'text/csv')
 
-    marketvalue_df = pd.DataFrame(marketvalue_data)
-    stats_df = pd.DataFrame(stats_data)
+#Modo sin red: gráficos de todos los equipos scrapeados hasta ahora, consultando el almacén analítico en disco.
+def show_analytics_mode():
     
-    #Combina las dos tablas en una única, por Jugador y Temporada.
-    combined_data = pd.merge(marketvalue_df, stats_df, on = ['Player', 'Season'], how = 'inner')
+    st.markdown('### Consultas sobre el Almacén Local')
     
-    return combined_data
-
-
-
-### APP STREAMLIT ###
+    if not DUCKDB_AVAILABLE:
+        st.error('Para consultar el almacén local hace falta DuckDB (pip install duckdb).')
+        return
+    
+    analytics = get_analytics_store()
+    query_start = time.perf_counter()
+    clubs = analytics.clubs()
+    if clubs.empty:
+        st.info('El almacén local está vacío: scrapea algún equipo en los otros modos para llenarlo.')
+        return
+    query_time = time.perf_counter() - query_start
+    
+    st.dataframe(clubs)
+    
+    #Filtros: los clubes y el rango de temporadas se pasan a las consultas, que solo leen las particiones que necesitan.
+    team_names = dict(zip(clubs['Code'], clubs['Team']))
+    codes = st.multiselect('Equipos:', options = list(team_names), default = list(team_names), format_func = team_names.get)
+    #Los valores iniciales salen del almacén, así que los ajustamos al rango del selector (Streamlit falla si se salen).
+    start_season = st.number_input('Temporada de inicio:', min_value = 2005, max_value = 2025,
+                                   value = min(2025, max(2005, int(clubs['First Season'].min()))))
+    end_season = st.number_input('Temporada de fin:', min_value = 2005, max_value = 2025,
+                                 value = min(2025, max(2005, int(clubs['Last Season'].max()))))
+    seasons = list(range(start_season, end_season + 1))
+    
+    query_start = time.perf_counter()
+    season_summary = analytics.season_summary(seasons, codes)
+    top_marketvalue = analytics.top_market_value(seasons, codes)
+    impact_leaders = analytics.impact_leaders(seasons, codes, 30)
+    query_time += time.perf_counter() - query_start
+    
+    if season_summary.empty:
+        st.info('No hay datos guardados de esos equipos en esas temporadas.')
+        return
+    
+    render_start = time.perf_counter()
+    import plotly.express as px
+    
+    #**Gráfico 3.1: Evolución del Valor de Mercado Promedio de cada Equipo**
+    st.subheader('Evolución del Valor de Mercado Promedio por Equipo')
+    
+    graf31 = px.line(season_summary,
+                     x = 'Season',
+                     y = 'Mean Market Value',
+                     color = 'Team',
+                     labels = {'Season': 'Temporada', 'Mean Market Value': 'Valor de Mercado Promedio (€)', 'Team': 'Equipo'},
+                     markers = True)
+    
+    st.plotly_chart(graf31)
+    
+    
+    #**Gráfico 3.2: Jugador con Mayor Valor de Mercado por Temporada entre todos los Equipos**
+    st.subheader('Jugador con Mayor Valor de Mercado por Temporada')
+    
+    graf32 = px.bar(top_marketvalue,
+                    x = 'Season',
+                    y = 'Market Value',
+                    color = 'Team',
+                    labels = {'Season': 'Temporada', 'Market Value': 'Valor de Mercado (€)', 'Team': 'Equipo'},
+                    text = 'Player')
+    
+    st.plotly_chart(graf32)
+    
+    
+    #**Gráfico 3.3: Jugadores con más Goles y Asistencias en el Rango**
+    st.subheader(f'Jugadores con más Goles y Asistencias ({start_season}-{end_season})')
+    
+    graf33 = px.bar(impact_leaders,
+                    x = 'Player',
+                    y = ['Goals', 'Assists'],
+                    labels = {'Player': 'Jugador'},
+                    barmode = 'stack',
+                    hover_data = ['Teams', 'Seasons'])
+    
+    graf33.update_layout(legend = dict(title = ''),
+                         yaxis = dict(title = 'Cantidad'))
+    
+    st.plotly_chart(graf33)
+    
+    st.caption(f'Consultas: {query_time * 1000:.0f} ms. Gráficos: {(time.perf_counter() - render_start) * 1000:.0f} ms.')
 
 #Definimos la página principal de nuestra aplicación de Streamlit.
 def main_app():
@@ -191,10 +186,16 @@ def main_app():
     #Título de la aplicación.
     st.title('Transfermarkt Scraper')
 
-    #Selector del modo que queremos emplear para el estudio: Rango de temporadas o Comparar dos temporadas.
+    #Selector del modo que queremos emplear para el estudio: Rango de temporadas, Comparar dos temporadas o consultar
+    #lo que ya se ha scrapeado (sin acceder a la red).
     mode = st.radio('Selecciona el método de estúdio:',
-                    options = ['Examinar un Rango de Temporadas', 'Examinar dos Temporadas'],
+                    options = ['Examinar un Rango de Temporadas', 'Examinar dos Temporadas', 'Consultar el Almacén Local'],
                     index = 0)
+    
+    #El modo del almacén local no scrapea, así que no necesita elegir equipo.
+    if mode == 'Consultar el Almacén Local':
+        show_analytics_mode()
+        return
 
     #Lista de equipos con sus códigos predefinidos.
     predefined_teams = {'Real Madrid': '418',
@@ -231,7 +232,9 @@ def main_app():
         #Podemos elejir un rango de años entre los últimos 20 años (para años anteriores no hay practicamente datos).
         start_season = st.number_input('Temporada de inicio:', min_value = 2005, max_value = 2025, value = 2020)
         end_season = st.number_input('Temporada de fin:', min_value = 2005, max_value = 2025, value = 2024)
-
+        
+        #Pasamos de las dos temporadas que limitan el rango a una lista con todos los años dentro de ese rango.
+        seasons = list(range(start_season, end_season + 1))
         
         if st.button('Scrapear Datos'):
             #Aparece una rueda de carga con el texto mientras se cargan los datos.
@@ -244,102 +247,118 @@ def main_app():
                 def display(message):
                     progress_placeholder.text(message)
 
-                #Pasamos de las dos temporadas que limitan el rango a una lista con todos los años dentro de ese rango.
-                seasons = list(range(start_season, end_season + 1))
                 #Llamada a la función principal de scraping para sacar el DataFrame final con los parámetros indicados en la app de Streamlit.
-                combined_data = scrape_transfermarkt_data(team, code, seasons, display)
-                #Mantiene la almacenado el DataFrame mientras la sesión esté activa.
-                st.session_state['combined_data'] = combined_data
+                metrics = ScrapeMetrics()
+                combined_data = scrape_with_live_table(team, code, seasons, display, metrics)
+                #Mantiene la almacenado el DataFrame mientras la sesión esté activa, junto a los parámetros con los que se obtuvo
+                #y a sus agregados (que se calculan una sola vez, la primera vez que los pide un gráfico).
+                st.session_state['combined_data'] = {'params': (team, code, seasons), 'data': combined_data, 'metrics': metrics,
+                                                     'aggregates': DashboardAggregates(combined_data)}
 
                 st.success('¡Datos obtenidos correctamente!')
-                st.write(combined_data)
-                
-                
-                #**Gráfico 1.1: Evolución del Valor de Mercado Promedio por Temporada**
-                st.subheader('Evolución del Valor de Mercado Promedio por Temporada')
-                
-                marketvalue_season = combined_data.groupby('Season')['Market Value'].mean().reset_index()
-                
-                #Gráfico de lineas.
-                graf11 = px.line(marketvalue_season,
-                                 x = 'Season',
-                                 y = 'Market Value',
-                                 labels = {'Season': 'Temporada', 'Market Value': 'Valor de Mercado Promedio (€)'},
-                                 markers = True)
-                
-                #Controlamos el formato del eje X.
-                graf11.update_layout(xaxis = dict(tickmode ='array', 
-                                                  tickvals = marketvalue_season['Season'],
-                                                  ticktext = marketvalue_season['Season'],  
-                                                  title = 'Temporada'))
-                
-                st.plotly_chart(graf11)
+        
+        #Los gráficos se dibujan a partir de los datos guardados en la sesión, fuera del botón: así, cuando Streamlit vuelve a
+        #ejecutar la página por cualquier otro cambio, se redibujan sin volver a scrapear (mientras no cambien equipo ni temporadas).
+        range_result = st.session_state.get('combined_data')
+        if range_result is not None and range_result['params'] == (team, code, seasons):
+            combined_data = range_result['data']
+            metrics = range_result['metrics']
+            aggregates = range_result['aggregates']
+            
+            st.write(combined_data)
+            
+            #Medimos lo que tardan en calcularse y dibujarse los gráficos.
+            render_start = time.perf_counter()
+            
+            #Plotly solo se importa cuando hay gráficos que dibujar, porque tarda en cargarse.
+            import plotly.express as px
+            
+            #**Gráfico 1.1: Evolución del Valor de Mercado Promedio por Temporada**
+            st.subheader('Evolución del Valor de Mercado Promedio por Temporada')
+            
+            marketvalue_season = aggregates.seasons
+            
+            #Gráfico de lineas.
+            graf11 = px.line(marketvalue_season,
+                             x = 'Season',
+                             y = 'Mean Market Value',
+                             labels = {'Season': 'Temporada', 'Mean Market Value': 'Valor de Mercado Promedio (€)'},
+                             markers = True)
+            
+            #Controlamos el formato del eje X.
+            graf11.update_layout(xaxis = dict(tickmode ='array', 
+                                              tickvals = marketvalue_season['Season'],
+                                              ticktext = marketvalue_season['Season'],  
+                                              title = 'Temporada'))
+            
+            st.plotly_chart(graf11)
 
 
-                #**Gráfico 1.2: Distribución de Goles y Asistencias por Jugador**
-                st.subheader('Distribución de Goles y Asistencias por Jugador')
-                
-                #Agrupamos para cada Temporada la suma de los Goles y Asistencias de cada Jugador.
-                goles_asistencias = combined_data.groupby(['Player', 'Season'])[['Goals', 'Assists']].sum().reset_index()
-                #Dentro de esta agrupación creamos la variable 'Total' con la suma de los Goles y Asistencias.
-                goles_asistencias['Total'] = goles_asistencias['Goals'] + goles_asistencias['Assists']
-                
-                #Seleccionar los 30 jugadores con más Goles y Asistencias.
-                top_jugadores = (goles_asistencias.groupby('Player')['Total'].sum().reset_index().sort_values(by = 'Total', ascending = False).head(30)['Player'])
-                
-                #Filtrar el DataFrame para incluir solo los jugadores seleccionados
-                goles_asistencias_filtered = goles_asistencias[goles_asistencias['Player'].isin(top_jugadores)]
+            #**Gráfico 1.2: Distribución de Goles y Asistencias por Jugador**
+            st.subheader('Distribución de Goles y Asistencias por Jugador')
             
-                #Ordenar los datos por Season (convertir a numérico temporalmente para ordenarlas temporadas correctamente).
-                goles_asistencias_filtered['Season'] = goles_asistencias_filtered['Season'].astype(int)
-                goles_asistencias_filtered = goles_asistencias_filtered.sort_values(by = ['Season', 'Player'])
-                goles_asistencias_filtered['Season'] = goles_asistencias_filtered['Season'].astype(str)
-                
-                #Variable con la descripción detallada que quiero que aparezca al pasar el raton sobre cada barra.
-                goles_asistencias_filtered['Desglose'] = ('Goles: ' + goles_asistencias_filtered['Goals'].astype(str) +
-                                                          ', Asistencias: ' + goles_asistencias_filtered['Assists'].astype(str))
-                
-                #Gráfico de barras.
-                graf12 = px.bar(goles_asistencias_filtered,
-                                x = 'Player',
-                                y = ['Goals','Assists'],
-                                color = 'Season',  # Colorear por Temporada.
-                                labels = {'Player': 'Jugador', 'Season': 'Temporada'},
-                                barmode = 'stack',  #Temporadas una encima de otra.
-                                hover_name = 'Desglose',
-                                hover_data = {'value': False})
-
-                #Editamos el formato de la leyenda y los ejes.
-                graf12.update_layout(legend = dict(title = 'Temporada',
-                                                   traceorder = 'reversed'),
-                                     xaxis = dict(title = 'Jugador'),
-                                     yaxis = dict(title = 'Cantidad'))
-
-                st.plotly_chart(graf12)
-
-
-                #**Gráfico 1.3: Jugador con Mayor Valor de Mercado por Temporada**
-                st.subheader('Jugador con Mayor Valor de Mercado por Temporada')
-                
-                #Seleccionamos los jugadores con mayor Valor de Mercado para cada Temporada.
-                top_marketvalue_players = combined_data.loc[combined_data.groupby('Season')['Market Value'].idxmax()]
-                
-                #Gráfico de barras.
-                graf13 = px.bar(top_marketvalue_players,
-                                x = 'Season',
-                                y = 'Market Value',
-                                color = 'Player',
-                                labels = {'Season': 'Temporada', 'Market Value': 'Valor de Mercado (€)', 'Player': 'Jugador'},
-                                text = 'Player')
-                
-                #Quitamos la leyenda y editamos el eje X.
-                graf13.update_layout(showlegend = False, 
-                                     xaxis = dict(tickmode = 'array',  
-                                                  tickvals = top_marketvalue_players['Season'],
-                                                  ticktext = top_marketvalue_players['Season'],  
-                                                  title = 'Temporada'))
+            #Suma de los Goles y Asistencias ('Total') de cada Jugador en cada Temporada.
+            goles_asistencias = aggregates.player_seasons
+            
+            #Seleccionar los 30 jugadores con más Goles y Asistencias.
+            top_jugadores = aggregates.top_players(30)
+            
+            #Filtrar el DataFrame para incluir solo los jugadores seleccionados
+            goles_asistencias_filtered = goles_asistencias[goles_asistencias['Player'].isin(top_jugadores)]
+
+            #Ordenar los datos por Season (convertir a numérico temporalmente para ordenarlas temporadas correctamente).
+            goles_asistencias_filtered = goles_asistencias_filtered.assign(Season = goles_asistencias_filtered['Season'].astype(int))
+            goles_asistencias_filtered = goles_asistencias_filtered.sort_values(by = ['Season', 'Player'])
+            goles_asistencias_filtered['Season'] = goles_asistencias_filtered['Season'].astype(str)
+            
+            #Variable con la descripción detallada que quiero que aparezca al pasar el raton sobre cada barra.
+            goles_asistencias_filtered['Desglose'] = ('Goles: ' + goles_asistencias_filtered['Goals'].astype(str) +
+                                                      ', Asistencias: ' + goles_asistencias_filtered['Assists'].astype(str))
+            
+            #Gráfico de barras.
+            graf12 = px.bar(goles_asistencias_filtered,
+                            x = 'Player',
+                            y = ['Goals','Assists'],
+                            color = 'Season',  # Colorear por Temporada.
+                            labels = {'Player': 'Jugador', 'Season': 'Temporada'},
+                            barmode = 'stack',  #Temporadas una encima de otra.
+                            hover_name = 'Desglose',
+                            hover_data = {'value': False})
+
+            #Editamos el formato de la leyenda y los ejes.
+            graf12.update_layout(legend = dict(title = 'Temporada',
+                                               traceorder = 'reversed'),
+                                 xaxis = dict(title = 'Jugador'),
+                                 yaxis = dict(title = 'Cantidad'))
+
+            st.plotly_chart(graf12)
+
+
+            #**Gráfico 1.3: Jugador con Mayor Valor de Mercado por Temporada**
+            st.subheader('Jugador con Mayor Valor de Mercado por Temporada')
+            
+            #Seleccionamos los jugadores con mayor Valor de Mercado para cada Temporada.
+            top_marketvalue_players = aggregates.market_value_leaders
+            
+            #Gráfico de barras.
+            graf13 = px.bar(top_marketvalue_players,
+                            x = 'Season',
+                            y = 'Market Value',
+                            color = 'Player',
+                            labels = {'Season': 'Temporada', 'Market Value': 'Valor de Mercado (€)', 'Player': 'Jugador'},
+                            text = 'Player')
+            
+            #Quitamos la leyenda y editamos el eje X.
+            graf13.update_layout(showlegend = False, 
+                                 xaxis = dict(tickmode = 'array',  
+                                              tickvals = top_marketvalue_players['Season'],
+                                              ticktext = top_marketvalue_players['Season'],  
+                                              title = 'Temporada'))
+
+            st.plotly_chart(graf13)
             
-                st.plotly_chart(graf13)
+            metrics.set_time('render', None, time.perf_counter() - render_start)
+            show_performance_panel(metrics)
 
 
     #Pasamos al estudio en el que comparamos dos temporadas específicas.
@@ -358,140 +377,120 @@ def main_app():
                     progress_placeholder.text(message)
 
                 #Introducimos las dos temporadas a comparar en formato lista como parametro seasons en la funcion principal de scrapeo.
-                combined_data = scrape_transfermarkt_data(team, code, [season_1, season_2], display)
-                st.session_state['comparison_data'] = combined_data
+                metrics = ScrapeMetrics()
+                combined_data = scrape_with_live_table(team, code, [season_1, season_2], display, metrics)
+                st.session_state['comparison_data'] = {'params': (team, code, [season_1, season_2]), 'data': combined_data,
+                                                       'metrics': metrics, 'aggregates': DashboardAggregates(combined_data)}
 
                 st.success(f'¡Datos obtenidos para las temporadas {season_1} y {season_2}!')
-                st.write(combined_data)
-                
-                
-                #**Gráfico 2.1: Jugador con Mayor Impacto (Goles + Asistencias) por Temporada**
-                st.subheader('Jugador con Mayor Impacto (Goles + Asistencias)')
-
-                #Para este caso imputamos todos los None a 0 para que los cálculos salgan correctamente.
-                combined_data = combined_data.fillna(0)
-                
-                #Creamos una columna "Total" que combina goles y asistencias
-                combined_data['Total'] = combined_data['Goals'] + combined_data['Assists']
-
-                #Inicializamos un DataFrame vacío para almacenar los jugadores con mayor impacto por temporada.
-                top_players_list = []
-
-                #Iteramos las dos temporadas que tenemos.
-                for season in combined_data['Season'].unique():
-                    
-                    #Filtra los datos para la temporada actual
-                    season_data = combined_data[combined_data['Season'] == season]
-                    #Encuentra el índice del jugador con mayor impacto (Total).
-                    top_player_index = season_data['Total'].idxmax()
-                    #Agrega el jugador al DataFrame de resultados.
-                    top_players_list.append(season_data.loc[top_player_index])
-                    
-                #Convertimos la lista de jugadores a un DataFrame.
-                top_players_by_season = pd.DataFrame(top_players_list)
-
-                #Creamos el gráfico de barras.
-                graf21 = px.bar(top_players_by_season,
-                                x = 'Season',
-                                y = 'Total',
-                                color = 'Player',
-                                labels = {'Total': 'Goles + Asistencias', 'Season': 'Temporada', 'Player': 'Jugador'},
-                                text = 'Player')
-                
-                #Aumentamos el tamaño del texto que aparece en las barras.
-                graf21.update_traces(textfont = dict(size = 18), 
-                                     textposition = 'inside')
-
-                #Ajustamos parametros como la leyenda y los ejes.
-                graf21.update_layout(showlegend = False,
-                                     xaxis = dict(title = 'Temporada',
-                                                  tickmode = 'array',
-                                                  tickvals = top_players_by_season['Season'],
-                                                  ticktext = top_players_by_season['Season']),
-                                     yaxis = dict(title = 'Goles + Asistencias'))
-                
-                st.plotly_chart(graf21)
-                
-                
-                
-                #**Gráfico 2.2: Resumen de tarjetas por temporada**
-                st.subheader('Resumen de Tarjetas por Temporada')
-
-                #Creamos una nueva columna para las tarjetas rojas totales.
-                combined_data['Red Cards'] = combined_data['Red Cards'].fillna(0) + combined_data['Second Card'].fillna(0)
-                combined_data['Yellow Cards'] = combined_data['Yellow Cards'].fillna(0)
-
-                #Se suman las tarjetas amarillas y rojas por temporada.
-                tarjetas_totales = combined_data.groupby('Season')[['Yellow Cards', 'Red Cards']].sum().reset_index()
-
-                #Pasamos el DataFrame tarjetas_totales a un formato 'long' (hacia abajo) para que se especifique el tipo de tarjeta y la cantidad como variables.
-                tarjetas_totales_long = tarjetas_totales.melt(id_vars = 'Season', 
-                                                              value_vars = ['Yellow Cards', 'Red Cards'], 
-                                                              var_name = 'Tipo de Tarjeta', 
-                                                              value_name = 'Cantidad')
-
-                #Gráfico de barras con los colores de las tarjetas.
-                graf22 = px.bar(tarjetas_totales_long,
-                                x = 'Season',
-                                y = 'Cantidad',
-                                color = 'Tipo de Tarjeta',
-                                labels = {'Season': 'Temporada', 'Cantidad': 'Total de Tarjetas', 'Tipo de Tarjeta': 'Tipo'},
-                                barmode = 'group',
-                                color_discrete_map = {'Yellow Cards': 'yellow', 'Red Cards': 'red'})
-                
-                graf22.update_layout(legend_title = 'Tipo de Tarjeta',
-                                     xaxis = dict(title = 'Temporada'),
-                                     yaxis = dict(title = 'Cantidad de Tarjetas'))
-
-                st.plotly_chart(graf22)
-
+        
+        comparison_result = st.session_state.get('comparison_data')
+        if comparison_result is not None and comparison_result['params'] == (team, code, [season_1, season_2]):
+            combined_data = comparison_result['data']
+            metrics = comparison_result['metrics']
+            aggregates = comparison_result['aggregates']
+            
+            st.write(combined_data)
+            
+            render_start = time.perf_counter()
+            import plotly.express as px
+            
+            #**Gráfico 2.1: Jugador con Mayor Impacto (Goles + Asistencias) por Temporada**
+            st.subheader('Jugador con Mayor Impacto (Goles + Asistencias)')
+
+            #Jugador con más goles + asistencias ("Total") de cada temporada. Los agregados cuentan como 0 los goles,
+            #asistencias y tarjetas que faltan, para que los cálculos salgan correctamente.
+            top_players_by_season = aggregates.impact_leaders
+
+            #Creamos el gráfico de barras.
+            graf21 = px.bar(top_players_by_season,
+                            x = 'Season',
+                            y = 'Total',
+                            color = 'Player',
+                            labels = {'Total': 'Goles + Asistencias', 'Season': 'Temporada', 'Player': 'Jugador'},
+                            text = 'Player')
+            
+            #Aumentamos el tamaño del texto que aparece en las barras.
+            graf21.update_traces(textfont = dict(size = 18), 
+                                 textposition = 'inside')
+
+            #Ajustamos parametros como la leyenda y los ejes.
+            graf21.update_layout(showlegend = False,
+                                 xaxis = dict(title = 'Temporada',
+                                              tickmode = 'array',
+                                              tickvals = top_players_by_season['Season'],
+                                              ticktext = top_players_by_season['Season']),
+                                 yaxis = dict(title = 'Goles + Asistencias'))
+            
+            st.plotly_chart(graf21)
+            
+            
+            
+            #**Gráfico 2.2: Resumen de tarjetas por temporada**
+            st.subheader('Resumen de Tarjetas por Temporada')
+
+            #Tarjetas amarillas y rojas de cada temporada (las rojas incluyen las de doble amarilla).
+            tarjetas_totales = aggregates.seasons
+
+            #Pasamos el DataFrame tarjetas_totales a un formato 'long' (hacia abajo) para que se especifique el tipo de tarjeta y la cantidad como variables.
+            tarjetas_totales_long = tarjetas_totales.melt(id_vars = 'Season', 
+                                                          value_vars = ['Yellow Cards', 'Red Cards'], 
+                                                          var_name = 'Tipo de Tarjeta', 
+                                                          value_name = 'Cantidad')
+
+            #Gráfico de barras con los colores de las tarjetas.
+            graf22 = px.bar(tarjetas_totales_long,
+                            x = 'Season',
+                            y = 'Cantidad',
+                            color = 'Tipo de Tarjeta',
+                            labels = {'Season': 'Temporada', 'Cantidad': 'Total de Tarjetas', 'Tipo de Tarjeta': 'Tipo'},
+                            barmode = 'group',
+                            color_discrete_map = {'Yellow Cards': 'yellow', 'Red Cards': 'red'})
+            
+            graf22.update_layout(legend_title = 'Tipo de Tarjeta',
+                                 xaxis = dict(title = 'Temporada'),
+                                 yaxis = dict(title = 'Cantidad de Tarjetas'))
 
-                #Además calculamos y mostramos en pantalla el jugador con más tarjetas para cada temporada.
-                jugador_mas_tarjetas = combined_data.groupby(['Season', 'Player'])[['Yellow Cards', 'Red Cards']].sum()
+            st.plotly_chart(graf22)
 
-                jugador_mas_tarjetas['Total'] = jugador_mas_tarjetas['Yellow Cards'] + jugador_mas_tarjetas['Red Cards']
-                jugador_mas_tarjetas = jugador_mas_tarjetas.reset_index()
 
-                jugadores_top = jugador_mas_tarjetas.loc[jugador_mas_tarjetas.groupby('Season')['Total'].idxmax()]
+            #Además mostramos en pantalla el jugador con más tarjetas para cada temporada.
+            jugadores_top = aggregates.card_leaders
 
-                #Mostramos el texto debajo del gráfico.
-                st.markdown('### Jugadores con Más Tarjetas por Temporada:')
-                for index, row in jugadores_top.iterrows():
-                    st.markdown(f'- **Temporada {row['Season']}:** {row['Player']} con {int(row['Total'])} tarjetas ({int(row['Yellow Cards'])} amarillas, {int(row['Red Cards'])} rojas)')
-                
-                
-                # **Gráfico 2.3: Jugador con Mayor Valor de Mercado por Temporada**
-                st.subheader('Jugador con Mayor Valor de Mercado por Temporada')
-
-                #Realizamos el mismo proceso que antes pero en este caso para la busqueda del jugador con máyor valor de mercado.
-                top_marketvalue_by_season = []
-
-                for season in combined_data['Season'].unique():
-                    
-                    season_data = combined_data[combined_data['Season'] == season]
-                    top_player_index = season_data['Market Value'].idxmax()
-                    top_marketvalue_by_season.append(season_data.loc[top_player_index])
-
-                top_marketvalue_by_season = pd.DataFrame(top_marketvalue_by_season)
-
-                graf23 = px.bar(top_marketvalue_by_season,
-                                x = 'Season',
-                                y = 'Market Value',
-                                color = 'Player',
-                                labels = {'Season': 'Temporada', 'Market Value': 'Valor de Mercado (€)', 'Player': 'Jugador'},
-                                text = 'Player')
-                
-                graf23.update_traces(textfont = dict(size = 18),  
-                                     textposition = 'inside')
+            #Mostramos el texto debajo del gráfico.
+            st.markdown('### Jugadores con Más Tarjetas por Temporada:')
+            for season, player, total, yellow, red in zip(jugadores_top['Season'], jugadores_top['Player'], jugadores_top['Total Cards'],
+                                                          jugadores_top['Yellow Cards'], jugadores_top['Red Cards']):
+                st.markdown(f'- **Temporada {season}:** {player} con {int(total)} tarjetas ({int(yellow)} amarillas, {int(red)} rojas)')
+            
+            
+            # **Gráfico 2.3: Jugador con Mayor Valor de Mercado por Temporada**
+            st.subheader('Jugador con Mayor Valor de Mercado por Temporada')
+
+            #Jugador con mayor valor de mercado de cada temporada.
+            top_marketvalue_by_season = aggregates.market_value_leaders
+
+            graf23 = px.bar(top_marketvalue_by_season,
+                            x = 'Season',
+                            y = 'Market Value',
+                            color = 'Player',
+                            labels = {'Season': 'Temporada', 'Market Value': 'Valor de Mercado (€)', 'Player': 'Jugador'},
+                            text = 'Player')
+            
+            graf23.update_traces(textfont = dict(size = 18),  
+                                 textposition = 'inside')
 
-                graf23.update_layout(showlegend = False,
-                                     xaxis = dict(title = 'Temporada',
-                                                  tickmode = 'array',
-                                                  tickvals = top_marketvalue_by_season['Season'],
-                                                  ticktext = top_marketvalue_by_season['Season']),
-                                     yaxis = dict(title = 'Valor de Mercado (€)'))
+            graf23.update_layout(showlegend = False,
+                                 xaxis = dict(title = 'Temporada',
+                                              tickmode = 'array',
+                                              tickvals = top_marketvalue_by_season['Season'],
+                                              ticktext = top_marketvalue_by_season['Season']),
+                                 yaxis = dict(title = 'Valor de Mercado (€)'))
 
-                st.plotly_chart(graf23)
+            st.plotly_chart(graf23)
+            
+            metrics.set_time('render', None, time.perf_counter() - render_start)
+            show_performance_panel(metrics)
                 
 #Ejecuta la aplicación
 if __name__ == '__main__':
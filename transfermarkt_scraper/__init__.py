@@ -0,0 +1,21 @@
+#Núcleo de scraping de Transfermarkt, sin dependencias de la interfaz (Streamlit y Plotly solo los usa la aplicación).
+#Uso desde la línea de comandos: python -m transfermarkt_scraper scrape --team real-madrid --code 418 --seasons 2010-2024 --out datos.parquet
+from .aggregates import DashboardAggregates
+from .analytics import ANALYTICS_COLUMNS, ANALYTICS_DIR, ANALYTICS_SCHEMA, DUCKDB_AVAILABLE, AnalyticsStore
+from .fetch import (CACHE_DIR, CACHE_MAX_BYTES, CACHE_TTL_CLOSED, CACHE_TTL_CURRENT, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX,
+                    HTTP_MAX_RETRIES, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_RETRY_STATUS, HTTP_STREAM_CHUNK_SIZE,
+                    HTTP_TIMEOUT, MAX_WORKERS, BodyStream, CachedResponse, Fetcher, ResponseCache, current_season,
+                    parse_retry_after, random_user_agent, season_ttl, shared_rate_limiter, user_agent_pool)
+from .league import get_competition_clubs, parse_competition_clubs, scrape_league
+from .metrics import ScrapeMetrics, timed
+from .normalize import SUFIJOS_VALOR, VALOR_RE, normalizar_columna, normalizar_texto, normalizar_valor
+from .parsing import (COMBINED_SCHEMA, FINGERPRINT_VERSION, LEAGUE_SCHEMA, MARKETVALUE_FIELDS, MARKETVALUE_SCHEMA, PARSER_BACKEND,
+                      PARSER_BACKENDS, STATS_FIELDS, STATS_SCHEMA, LxmlBackend, SoupBackend, apply_schema, check_fingerprint,
+                      check_source, extract_columns, parse_marketvalue_page, parse_stats_page, source_fingerprint,
+                      table_fingerprint)
+from .ratelimit import (CONCURRENCY_INITIAL, RATE_BLOCK_STATUS, RATE_DECREASE, RATE_INCREASE, RATE_INITIAL, RATE_MAX,
+                        RATE_MIN, HostRateLimiter, RateLimiter)
+from .scraper import (combine_seasons, default_fetcher, fetch_and_parse, fetch_page, forget_blocked_page, iter_transfermarkt_seasons,
+                      merge_season, scrape_transfermarkt_data, stream_and_parse)
+from .store import SEASON_CACHE_MAX_ENTRIES, STORE_DIR, SeasonFrameCache, SeasonStore
+from .urls import get_competition_clubs_url, get_team_season_marketvalues_url, get_team_season_stats_url
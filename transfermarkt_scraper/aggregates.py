@@ -0,0 +1,71 @@
+#Agregados de los gráficos de la aplicación, calculados con pasadas agrupadas y vectorizadas sobre el DataFrame combinado.
+import functools
+
+
+#Columnas de conteo: un nulo (jugador sin ese dato en la temporada) cuenta como 0 en las sumas.
+COUNT_COLUMNS = ['Goals', 'Assists', 'Yellow Cards', 'Second Card', 'Red Cards']
+
+#Resúmenes por temporada y por jugador de un DataFrame combinado (el de scrape_transfermarkt_data o el de scrape_league).
+#Cada resumen se calcula la primera vez que se pide, con una sola agrupación para todas sus columnas, y se guarda en el
+#objeto: si se guarda junto a los datos (como hace la aplicación en la sesión), redibujar los gráficos no vuelve a agrupar nada.
+#Las tarjetas rojas de los resúmenes incluyen las expulsiones por doble amarilla (Second Card).
+class DashboardAggregates:
+
+    def __init__(self, df):
+        self.df = df
+        self._top_players = {}
+
+    #Filas del DataFrame con los conteos sin nulos, 'Total' (goles + asistencias), las rojas totales y 'Total Cards'.
+    @functools.cached_property
+    def rows(self):
+        counts = {column: self.df[column].fillna(0) for column in COUNT_COLUMNS if column in self.df}
+        rows = self.df.assign(**counts)
+        return rows.assign(**{'Total': rows['Goals'] + rows['Assists'],
+                              'Red Cards': rows['Red Cards'] + rows['Second Card'],
+                              'Total Cards': rows['Yellow Cards'] + rows['Red Cards'] + rows['Second Card']})
+
+    #Una fila por (temporada, jugador) con la suma de goles, asistencias y tarjetas.
+    @functools.cached_property
+    def player_seasons(self):
+        columns = ['Goals', 'Assists', 'Total', 'Yellow Cards', 'Red Cards', 'Total Cards']
+        return self.rows.groupby(['Season', 'Player'], observed = True)[columns].sum().reset_index()
+
+    #Una fila por temporada: valor de mercado medio y máximo, jugadores y totales de goles, asistencias y tarjetas.
+    @functools.cached_property
+    def seasons(self):
+        return self.rows.groupby('Season', observed = True).agg(**{
+            'Mean Market Value': ('Market Value', 'mean'),
+            'Max Market Value': ('Market Value', 'max'),
+            'Players': ('Player', 'size'),
+            'Goals': ('Goals', 'sum'),
+            'Assists': ('Assists', 'sum'),
+            'Yellow Cards': ('Yellow Cards', 'sum'),
+            'Red Cards': ('Red Cards', 'sum')}).reset_index()
+
+    #Fila con el mayor valor de la columna en cada temporada, en el orden de las temporadas.
+    #Con un empate se queda la primera fila, como idxmax, y una temporada sin ningún valor conserva su primera fila.
+    def _season_leaders(self, df, column):
+        leaders = df.sort_values(column, ascending = False, kind = 'stable', na_position = 'last').drop_duplicates('Season')
+        return leaders.sort_values('Season', kind = 'stable').reset_index(drop = True)
+
+    #Jugador con mayor valor de mercado de cada temporada (la fila completa del DataFrame).
+    @functools.cached_property
+    def market_value_leaders(self):
+        return self._season_leaders(self.rows, 'Market Value')
+
+    #Jugador con más goles + asistencias ('Total') de cada temporada.
+    @functools.cached_property
+    def impact_leaders(self):
+        return self._season_leaders(self.rows, 'Total')
+
+    #Jugador con más tarjetas ('Total Cards') de cada temporada.
+    @functools.cached_property
+    def card_leaders(self):
+        return self._season_leaders(self.player_seasons, 'Total Cards')
+
+    #Los n jugadores con más goles + asistencias sumando todas las temporadas, de más a menos.
+    def top_players(self, n):
+        if n not in self._top_players:
+            totals = self.player_seasons.groupby('Player')['Total'].sum()
+            self._top_players[n] = totals.sort_values(ascending = False, kind = 'stable').head(n).index
+        return self._top_players[n]
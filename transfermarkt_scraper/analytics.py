@@ -0,0 +1,140 @@
+#Almacén analítico local: los DataFrames combinados de todos los clubes scrapeados en un dataset Parquet particionado por club
+#y temporada, que se consulta con DuckDB directamente desde el disco (sin volver a scrapear ni cargarlo entero en memoria).
+import pandas as pd
+import glob
+import importlib.util
+import os
+import threading
+
+from .parsing import LEAGUE_SCHEMA, apply_schema
+
+
+#Directorio por defecto del almacén analítico.
+ANALYTICS_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'transfermarkt-scraper', 'analytics')
+
+#DuckDB es opcional: solo hace falta para consultar el almacén (para escribirlo basta con pyarrow). Como con lxml, solo
+#comprobamos si está instalado y lo importamos la primera vez que se consulta.
+DUCKDB_AVAILABLE = importlib.util.find_spec('duckdb') is not None
+
+#Columnas de cada fichero: las de scrape_league salvo Code y Season, que van en la ruta de la partición.
+ANALYTICS_SCHEMA = {column: dtype for column, dtype in LEAGUE_SCHEMA.items() if column not in ('Code', 'Season')}
+ANALYTICS_COLUMNS = list(ANALYTICS_SCHEMA)
+
+#Dataset Parquet con particiones de estilo Hive (Code=418/Season=2010/data.parquet): el código del club y la temporada van
+#en la ruta y no dentro del fichero. Así, las consultas que filtran por club o temporada solo abren los ficheros de esas
+#particiones y, como Parquet es columnar, solo leen las columnas que usan. Todas las consultas van contra la vista players,
+#con una fila por jugador, club y temporada (las columnas de scrape_league: Team, Code, Season, Player, Market Value...).
+class AnalyticsStore:
+
+    #La ruta se normaliza porque DuckDB lee los pares clave=valor de toda la ruta (también de un 'Code=418/..' que le sobre).
+    def __init__(self, directory = ANALYTICS_DIR):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(directory, exist_ok = True)
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def _path(self, code, season):
+        return os.path.join(self.directory, f'Code={code}', f'Season={season}', 'data.parquet')
+
+    #Comprueba si hay algún fichero guardado (DuckDB no admite una vista sobre un patrón que no encuentra ficheros).
+    def has_data(self):
+        return next(glob.iglob(os.path.join(glob.escape(self.directory), 'Code=*', 'Season=*', '*.parquet')), None) is not None
+
+    #Guarda un DataFrame combinado, sustituyendo las particiones (club, temporada) que ya existieran.
+    #Acepta el DataFrame de scrape_transfermarkt_data (indicando team y code) o el de scrape_league (con columnas Team y Code).
+    #Devuelve el número de particiones escritas.
+    def write(self, df, team = None, code = None):
+        if 'Code' not in df:
+            df = df.assign(Team = team, Code = str(code))
+        written = 0
+        for (code, season), partition in df.groupby(['Code', 'Season'], observed = True, sort = False):
+            path = self._path(code, season)
+            os.makedirs(os.path.dirname(path), exist_ok = True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'  #Único entre procesos e hilos.
+
+            #Todas las particiones se guardan con las mismas columnas y tipos, así DuckDB no tiene que leer el esquema de
+            #cada fichero para unirlas. Las categorías van como texto (una categoría sin valores se guardaría con tipo nulo).
+            partition = apply_schema(partition.reindex(columns = ANALYTICS_COLUMNS), ANALYTICS_SCHEMA)
+            partition = partition.astype({column: 'string' for column in ANALYTICS_COLUMNS if ANALYTICS_SCHEMA[column] in (None, 'category')})
+            partition.to_parquet(tmp_path, index = False)
+            os.replace(tmp_path, path)
+            written += 1
+        return written
+
+    #Conexión de DuckDB (en memoria) con la vista players sobre el dataset. Se crea una sola vez: la vista vuelve a
+    #listar los ficheros en cada consulta, así que ve las particiones que se escriban después.
+    def connect(self):
+        if not DUCKDB_AVAILABLE:
+            raise ImportError('Para consultar el almacén analítico hace falta DuckDB (pip install duckdb).')
+        import duckdb
+
+        with self.lock:
+            if self.connection is None:
+                pattern = os.path.join(self.directory, 'Code=*', 'Season=*', '*.parquet').replace("'", "''")
+                connection = duckdb.connect()
+                connection.execute(f"CREATE VIEW players AS SELECT * FROM read_parquet('{pattern}', hive_partitioning = true, "
+                                   f"hive_types = {{'Code': VARCHAR, 'Season': INTEGER}})")
+                self.connection = connection
+            return self.connection
+
+    #Ejecuta una consulta SQL sobre la vista players y devuelve el resultado como DataFrame (vacío si aún no hay datos).
+    #Cada consulta usa su propio cursor, así que se puede llamar desde varios hilos (por ejemplo, varias sesiones de Streamlit).
+    def query(self, sql, params = None):
+        if not self.has_data():
+            return pd.DataFrame()
+        cursor = self.connect().cursor()
+        try:
+            return cursor.execute(sql, params or []).df()
+        finally:
+            cursor.close()
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    #Condición WHERE (y sus parámetros) para quedarse con unas temporadas y unos clubes (None es sin filtro).
+    #Filtrar por las columnas de la partición hace que DuckDB descarte los ficheros del resto sin abrirlos.
+    def _where(self, seasons = None, codes = None, extra = None):
+        conditions = [extra] if extra else []
+        params = []
+        if seasons is not None:
+            seasons = [int(season) for season in seasons]
+            conditions.append(f'Season IN ({", ".join("?" * len(seasons))})' if seasons else 'false')
+            params.extend(seasons)
+        if codes is not None:
+            codes = [str(code) for code in codes]
+            conditions.append(f'Code IN ({", ".join("?" * len(codes))})' if codes else 'false')
+            params.extend(codes)
+        return (f'WHERE {" AND ".join(conditions)}' if conditions else ''), params
+
+    #Clubes guardados: nombre, código, primera y última temporada, número de temporadas y de filas.
+    def clubs(self):
+        return self.query('SELECT any_value(Team) AS Team, Code, min(Season) AS "First Season", max(Season) AS "Last Season", '
+                          'count(DISTINCT Season) AS Seasons, count(*) AS Rows FROM players GROUP BY Code ORDER BY Team')
+
+    #Jugador con mayor valor de mercado de cada temporada entre todos los clubes guardados (o los de codes).
+    def top_market_value(self, seasons = None, codes = None):
+        where, params = self._where(seasons, codes, '"Market Value" IS NOT NULL')
+        return self.query(f'SELECT Season, Team, Code, Player, "Player ID", Position, "Market Value" FROM players {where} '
+                          f'QUALIFY row_number() OVER (PARTITION BY Season ORDER BY "Market Value" DESC, Team, Player) = 1 '
+                          f'ORDER BY Season', params)
+
+    #Los limit jugadores con más goles + asistencias ('Total') sumando las temporadas y clubes indicados, de más a menos.
+    #Un jugador que ha pasado por varios clubes suma en todos (se agrupa por su identificador de Transfermarkt).
+    def impact_leaders(self, seasons = None, codes = None, limit = 30):
+        where, params = self._where(seasons, codes)
+        return self.query(f'SELECT any_value(Player) AS Player, string_agg(DISTINCT Team, \', \' ORDER BY Team) AS Teams, '
+                          f'CAST(coalesce(sum(Goals), 0) AS INTEGER) AS Goals, CAST(coalesce(sum(Assists), 0) AS INTEGER) AS Assists, '
+                          f'CAST(coalesce(sum(Goals), 0) + coalesce(sum(Assists), 0) AS INTEGER) AS Total, count(DISTINCT Season) AS Seasons '
+                          f'FROM players {where} GROUP BY coalesce(CAST("Player ID" AS VARCHAR), Player) '
+                          f'ORDER BY Total DESC, Player LIMIT ?', params + [int(limit)])
+
+    #Una fila por club y temporada: valor de mercado medio y máximo, jugadores y totales de goles y asistencias.
+    def season_summary(self, seasons = None, codes = None):
+        where, params = self._where(seasons, codes)
+        return self.query(f'SELECT Season, any_value(Team) AS Team, Code, avg("Market Value") AS "Mean Market Value", '
+                          f'max("Market Value") AS "Max Market Value", count(*) AS Players, '
+                          f'CAST(coalesce(sum(Goals), 0) AS INTEGER) AS Goals, CAST(coalesce(sum(Assists), 0) AS INTEGER) AS Assists '
+                          f'FROM players {where} GROUP BY Season, Code ORDER BY Season, Team', params)
@@ -0,0 +1,105 @@
+#Línea de comandos del scraper, para usarlo sin la aplicación de Streamlit (por ejemplo, desde un cron).
+#python -m transfermarkt_scraper scrape --team real-madrid --code 418 --seasons 2010-2024 --out datos.parquet
+#python -m transfermarkt_scraper query impact-leaders --seasons 2015-2024
+import argparse
+import sys
+
+from .analytics import ANALYTICS_DIR, AnalyticsStore
+from .fetch import CACHE_DIR, MAX_WORKERS, ResponseCache
+from .parsing import PARSER_BACKEND, PARSER_BACKENDS
+from .scraper import scrape_transfermarkt_data
+from .store import STORE_DIR, SeasonStore
+
+#Convierte '2010-2024', '2010,2015,2020' o una combinación ('2010-2012,2020') en la lista de temporadas.
+def parse_seasons(text):
+    seasons = []
+    for part in text.split(','):
+        start, _, end = part.strip().partition('-')
+        try:
+            first = int(start)
+            last = int(end) if end else first
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'Temporadas no válidas: {text!r} (usa p. ej. 2010-2024 o 2010,2015)')
+        seasons.extend(range(first, last + 1))
+    return seasons
+
+#Consultas del comando query: nombre -> función que recibe el almacén y los argumentos.
+QUERY_REPORTS = {'clubs': lambda store, args: store.clubs(),
+                 'top-market-value': lambda store, args: store.top_market_value(args.seasons, args.codes),
+                 'impact-leaders': lambda store, args: store.impact_leaders(args.seasons, args.codes, args.limit),
+                 'season-summary': lambda store, args: store.season_summary(args.seasons, args.codes)}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog = 'python -m transfermarkt_scraper', description = 'Scraper de Transfermarkt.')
+    commands = parser.add_subparsers(dest = 'command', required = True)
+    
+    scrape = commands.add_parser('scrape', help = 'Scrapea los valores de mercado y las estadísticas de un equipo.')
+    scrape.add_argument('--team', required = True, help = 'Nombre del equipo en la URL de Transfermarkt (p. ej. real-madrid).')
+    scrape.add_argument('--code', required = True, help = 'Código del equipo en la URL de Transfermarkt (p. ej. 418).')
+    scrape.add_argument('--seasons', required = True, type = parse_seasons, help = 'Temporadas: 2010-2024, 2010,2015 o ambas.')
+    scrape.add_argument('--out', required = True, help = 'Fichero de salida (.parquet o .csv).')
+    scrape.add_argument('--workers', type = int, default = MAX_WORKERS, help = 'Descargas simultáneas.')
+    scrape.add_argument('--parser', choices = sorted(PARSER_BACKENDS), default = PARSER_BACKEND, help = 'Analizador HTML.')
+    scrape.add_argument('--cache-dir', default = CACHE_DIR, help = 'Directorio de la caché de respuestas HTTP.')
+    scrape.add_argument('--store-dir', default = STORE_DIR, help = 'Directorio del almacén de temporadas ya analizadas.')
+    scrape.add_argument('--stream', action = 'store_true', help = 'Analizar cada página mientras se descarga (con --parser lxml).')
+    scrape.add_argument('--no-cache', action = 'store_true', help = 'No usar la caché de respuestas ni el almacén de temporadas.')
+    scrape.add_argument('--metrics', help = 'Guarda las métricas de rendimiento en este fichero (.json o .csv).')
+    scrape.add_argument('--analytics-dir', default = ANALYTICS_DIR, help = 'Directorio del almacén analítico.')
+    scrape.add_argument('--no-analytics', action = 'store_true', help = 'No guardar el resultado en el almacén analítico.')
+    scrape.add_argument('--quiet', action = 'store_true', help = 'No mostrar el progreso.')
+    
+    query = commands.add_parser('query', help = 'Consulta el almacén analítico (sin acceder a la red).')
+    query.add_argument('report', choices = sorted(QUERY_REPORTS), help = 'Consulta a ejecutar.')
+    query.add_argument('--seasons', type = parse_seasons, help = 'Temporadas: 2010-2024, 2010,2015 o ambas (por defecto todas).')
+    query.add_argument('--codes', type = lambda text: [code.strip() for code in text.split(',')],
+                       help = 'Códigos de los clubes separados por comas (por defecto todos).')
+    query.add_argument('--limit', type = int, default = 30, help = 'Número de jugadores de impact-leaders.')
+    query.add_argument('--analytics-dir', default = ANALYTICS_DIR, help = 'Directorio del almacén analítico.')
+    query.add_argument('--out', help = 'Guarda el resultado en este fichero (.parquet o .csv) en lugar de mostrarlo.')
+    return parser
+
+def run_scrape(args):
+    def display(message):
+        print(message, file = sys.stderr)
+    
+    combined_data, metrics = scrape_transfermarkt_data(args.team, args.code, args.seasons,
+                                                       display = None if args.quiet else display,
+                                                       return_metrics = True,
+                                                       max_workers = args.workers,
+                                                       parser_backend = args.parser,
+                                                       stream = args.stream,
+                                                       cache = None if args.no_cache else ResponseCache(args.cache_dir),
+                                                       store = None if args.no_cache else SeasonStore(args.store_dir),
+                                                       analytics = None if args.no_analytics else AnalyticsStore(args.analytics_dir))
+    if args.out.endswith('.csv'):
+        combined_data.to_csv(args.out, index = False)
+    else:
+        combined_data.to_parquet(args.out, index = False)
+    
+    if args.metrics:
+        if args.metrics.endswith('.csv'):
+            metrics.to_csv(args.metrics)
+        else:
+            metrics.to_json(args.metrics)
+    if not args.quiet:
+        display(f'{len(combined_data)} filas de {combined_data["Season"].nunique()} temporadas guardadas en {args.out} '
+                f'({metrics.wall_time:.2f} s).')
+    return 0 if len(combined_data) else 1
+
+def run_query(args):
+    result = QUERY_REPORTS[args.report](AnalyticsStore(args.analytics_dir), args)
+    if args.out is None:
+        print(result.to_string(index = False))
+    elif args.out.endswith('.csv'):
+        result.to_csv(args.out, index = False)
+    else:
+        result.to_parquet(args.out, index = False)
+    return 0 if len(result) else 1
+
+def main(argv = None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'scrape':
+        sys.exit(run_scrape(args))
+    if args.command == 'query':
+        sys.exit(run_query(args))
@@ -0,0 +1,395 @@
+#Capa de descarga: sesión HTTP con reintentos, caché de respuestas en disco y agentes de usuario.
+import requests
+from requests.adapters import HTTPAdapter
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import functools
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+from .ratelimit import RateLimiter
+
+
+#Número máximo de descargas simultáneas por defecto (páginas de valores de mercado y de estadísticas).
+MAX_WORKERS = 8
+
+#Pool de agentes de usuario de fake_useragent. Cargar su base de datos de navegadores es lento,
+#así que se construye una sola vez (la primera vez que hace falta) y se reutiliza en todas las descargas.
+@functools.lru_cache(maxsize = None)
+def user_agent_pool():
+    from fake_useragent import UserAgent
+    return UserAgent()
+
+#Agente de usuario aleatorio para las cabeceras del Fetcher, para evitar bloqueos.
+def random_user_agent():
+    return user_agent_pool().random
+
+#Parámetros por defecto de la capa de descarga.
+HTTP_POOL_CONNECTIONS = 2  #Un pool de conexiones por host (transfermarkt.co.uk y transfermarkt.es).
+HTTP_POOL_MAXSIZE = MAX_WORKERS  #Conexiones keep-alive que se mantienen abiertas en cada pool.
+HTTP_TIMEOUT = (5, 30)  #Segundos de espera para conectar y para leer la respuesta.
+HTTP_MAX_RETRIES = 4  #Reintentos después del primer intento fallido.
+HTTP_BACKOFF_BASE = 1.0  #Espera base (segundos) del backoff exponencial.
+HTTP_BACKOFF_MAX = 60.0  #Espera máxima entre dos intentos.
+HTTP_RETRY_STATUS = {403, 429, 500, 502, 503, 504}  #Códigos de respuesta que merece la pena reintentar (403 suele ser un bloqueo temporal).
+HTTP_STREAM_CHUNK_SIZE = 16 * 1024  #Bytes de cada trozo del cuerpo en las descargas por trozos.
+
+#Limitador por host compartido por todo el proceso: lo usan por defecto todos los Fetcher, así el ritmo aprendido se
+#conserva entre llamadas (por ejemplo, entre pulsaciones de la aplicación) y las sesiones simultáneas de Streamlit
+#no atacan el mismo host cada una con su propio limitador.
+@functools.lru_cache(maxsize = None)
+def shared_rate_limiter():
+    return RateLimiter(max_concurrency = HTTP_POOL_MAXSIZE)
+
+#Convierte la cabecera Retry-After (segundos o fecha HTTP) en segundos de espera.
+def parse_retry_after(value):
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_date.tzinfo is None:
+        retry_date = retry_date.replace(tzinfo = timezone.utc)
+    return max(0.0, (retry_date - datetime.now(timezone.utc)).total_seconds())
+
+#Parámetros por defecto de la caché de respuestas en disco.
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'transfermarkt-scraper', 'http')
+CACHE_MAX_BYTES = 200 * 1024 * 1024  #Presupuesto de disco de la caché (200 MB).
+CACHE_TTL_CLOSED = 30 * 24 * 3600  #Las temporadas cerradas casi nunca cambian: 30 días.
+CACHE_TTL_CURRENT = 6 * 3600  #La temporada en curso cambia a menudo: 6 horas.
+
+#Temporada en curso según Transfermarkt (la temporada 2024 es la 2024/25, que empieza en julio de 2024).
+def current_season():
+    today = datetime.now()
+    return today.year if today.month >= 7 else today.year - 1
+
+#Tiempo de vida en caché de las páginas de una temporada: largo para las cerradas y corto para la actual.
+def season_ttl(season):
+    return CACHE_TTL_CLOSED if int(season) < current_season() else CACHE_TTL_CURRENT
+
+#Respuesta servida desde la caché, con los mismos atributos que usamos de requests.Response.
+class CachedResponse:
+    
+    def __init__(self, url, content, meta, retries = 0):
+        self.url = url
+        self.status_code = 200
+        self.content = content
+        self.headers = {}
+        self.meta = meta
+        self.from_cache = True
+        self.retries = retries
+    
+    def close(self):
+        pass
+
+#Cuerpo de una respuesta que se lee por trozos a medida que llega de la red (con Fetcher.get_stream).
+#Se recorre una sola vez; al terminar, on_complete recibe el cuerpo entero (lo usa el Fetcher para guardarlo en la caché,
+#así que una lectura interrumpida no se guarda). Cuenta los bytes leídos y los segundos que se ha esperado a la red,
+#para separar el tiempo de descarga del de análisis cuando se analiza mientras se descarga.
+#Al terminar de leerlo (o con close si no se lee entero) se cierra la respuesta y se devuelve su hueco del limitador.
+class BodyStream:
+    
+    def __init__(self, response, chunk_size = HTTP_STREAM_CHUNK_SIZE, on_complete = None):
+        self.response = response
+        self.chunk_size = chunk_size
+        self.on_complete = on_complete
+        self.bytes = 0
+        self.wait = 0.0
+    
+    def __iter__(self):
+        if getattr(self.response, 'from_cache', False):
+            yield self.response.content
+            return
+        
+        chunks = [] if self.on_complete is not None else None
+        iterator = self.response.iter_content(self.chunk_size)
+        try:
+            while True:
+                start = time.perf_counter()
+                chunk = next(iterator, None)
+                self.wait += time.perf_counter() - start
+                if chunk is None:
+                    break
+                self.bytes += len(chunk)
+                if chunks is not None:
+                    chunks.append(chunk)
+                yield chunk
+        finally:
+            #Devuelve la conexión al pool (o la cierra si no se ha leído entera).
+            self.response.close()
+        if chunks is not None:
+            self.on_complete(b''.join(chunks))
+    
+    def close(self):
+        self.response.close()
+
+#Caché persistente de respuestas HTTP indexada por URL.
+#Cada entrada guarda el cuerpo en un fichero .body y sus metadatos (ETag, Last-Modified, TTL, último acceso) en un .json.
+#Cuando una entrada caduca se revalida con un GET condicional, y las menos usadas recientemente se eliminan
+#para mantener la caché por debajo de max_bytes.
+class ResponseCache:
+    
+    def __init__(self, directory = CACHE_DIR, max_bytes = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok = True)
+        
+        #Tamaño actual de la caché, calculado una vez al arrancar y actualizado en cada escritura.
+        self.total_bytes = sum(meta['size'] for _, meta in self._entries())
+    
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.body'), os.path.join(self.directory, key + '.json')
+    
+    #Recorre los metadatos de todas las entradas guardadas.
+    def _entries(self):
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            meta_path = os.path.join(self.directory, name)
+            try:
+                with open(meta_path, encoding = 'utf-8') as meta_file:
+                    yield meta_path, json.load(meta_file)
+            except (OSError, ValueError):
+                continue
+    
+    #Escribe un fichero de forma atómica para que un lector nunca vea una entrada a medias.
+    def _write(self, path, data):
+        #Proceso e hilo en el nombre: varios procesos (los de scrape_league) pueden escribir en el mismo directorio.
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    
+    def _write_meta(self, meta_path, meta):
+        self._write(meta_path, json.dumps(meta).encode('utf-8'))
+    
+    def _remove(self, url):
+        removed = 0
+        for path in self._paths(url):
+            try:
+                if path.endswith('.body'):
+                    removed = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                pass
+        return removed
+    
+    #Devuelve (metadatos, cuerpo) de una URL o None si no está en caché. Marca la entrada como usada.
+    def get(self, url):
+        body_path, meta_path = self._paths(url)
+        with self.lock:
+            try:
+                with open(meta_path, encoding = 'utf-8') as meta_file:
+                    meta = json.load(meta_file)
+                with open(body_path, 'rb') as body_file:
+                    body = body_file.read()
+            except (OSError, ValueError):
+                return None
+            meta['last_access'] = time.time()
+            self._write_meta(meta_path, meta)
+        return meta, body
+    
+    def is_fresh(self, meta):
+        return time.time() - meta['stored_at'] < meta['ttl']
+    
+    #Cabeceras para revalidar una entrada caducada con un GET condicional.
+    def conditional_headers(self, meta):
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+    
+    #Guarda (o sustituye) la respuesta de una URL con el TTL indicado y aplica el presupuesto de disco.
+    def store(self, url, content, headers, ttl):
+        body_path, meta_path = self._paths(url)
+        now = time.time()
+        meta = {'url': url,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'stored_at': now,
+                'last_access': now,
+                'ttl': ttl,
+                'size': len(content)}
+        with self.lock:
+            self.total_bytes -= self._remove(url)
+            self._write(body_path, content)
+            self._write_meta(meta_path, meta)
+            self.total_bytes += len(content)
+            self._evict()
+    
+    #Una respuesta 304 confirma que la copia guardada sigue siendo válida: renovamos su TTL.
+    def refresh(self, url, meta, ttl):
+        _, meta_path = self._paths(url)
+        meta['stored_at'] = time.time()
+        meta['ttl'] = ttl
+        with self.lock:
+            self._write_meta(meta_path, meta)
+    
+    #Elimina la entrada de una URL. Se usa cuando una respuesta 200 resulta ser una página de bloqueo (sin tabla de jugadores),
+    #para que no se siga sirviendo desde la caché durante todo su TTL.
+    def invalidate(self, url):
+        with self.lock:
+            self.total_bytes -= self._remove(url)
+    
+    #Elimina las entradas usadas hace más tiempo (LRU) hasta volver a estar por debajo del presupuesto.
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        entries = sorted(self._entries(), key = lambda entry: entry[1].get('last_access', 0))
+        for _, meta in entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.total_bytes -= self._remove(meta['url'])
+    
+    #Vacía la caché por completo.
+    def clear(self):
+        with self.lock:
+            for _, meta in list(self._entries()):
+                self._remove(meta['url'])
+            self.total_bytes = 0
+
+#Capa de descarga compartida: una sesión de requests con pools de conexiones keep-alive por host
+#y reintentos con backoff exponencial y jitter que respetan la cabecera Retry-After.
+#Si se le pasa una ResponseCache, las páginas vigentes se sirven desde disco sin tocar la red.
+#Cada petición a la red pasa por un limitador adaptativo por host (RateLimiter) que busca el ritmo más alto que el host
+#acepta sin bloquearnos. Por defecto es el del proceso (shared_rate_limiter); se puede pasar uno propio o desactivarlo
+#con rate_limiter = False.
+class Fetcher:
+    
+    def __init__(self, headers = None, pool_connections = HTTP_POOL_CONNECTIONS, pool_maxsize = HTTP_POOL_MAXSIZE,
+                 timeout = HTTP_TIMEOUT, max_retries = HTTP_MAX_RETRIES, backoff_base = HTTP_BACKOFF_BASE,
+                 backoff_max = HTTP_BACKOFF_MAX, retry_status = HTTP_RETRY_STATUS, cache = None, rate_limiter = None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_status = set(retry_status)
+        self.cache = cache
+        if rate_limiter is None:
+            rate_limiter = shared_rate_limiter()
+        self.rate_limiter = rate_limiter or None
+        
+        #Los reintentos los gestionamos nosotros, así que el adaptador no reintenta por su cuenta.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections = pool_connections, pool_maxsize = pool_maxsize, max_retries = 0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        self.session.close()
+    
+    #Espera antes del reintento número attempt: Retry-After si el servidor lo indica, si no backoff exponencial con jitter completo.
+    def backoff_delay(self, attempt, response = None):
+        retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    #Descarga una URL pasando por la caché (si la hay). ttl indica cuánto tiempo se considera vigente la respuesta guardada.
+    def get(self, url, ttl = CACHE_TTL_CURRENT, **kwargs):
+        if self.cache is None:
+            return self.fetch(url, **kwargs)
+        
+        cached = self.cache.get(url)
+        if cached is not None:
+            meta, body = cached
+            if self.cache.is_fresh(meta):
+                return CachedResponse(url, body, meta)
+            
+            #Entrada caducada: preguntamos al servidor si ha cambiado (304) antes de volver a descargarla.
+            headers = dict(kwargs.pop('headers', None) or {})
+            headers.update(self.cache.conditional_headers(meta))
+            response = self.fetch(url, headers = headers, **kwargs)
+            if response.status_code == 304:
+                response.close()
+                self.cache.refresh(url, meta, ttl)
+                return CachedResponse(url, body, meta, response.retries)
+        else:
+            response = self.fetch(url, **kwargs)
+        
+        #Con stream = True el cuerpo aún no se ha leído: lo guarda get_stream cuando termina de leerse.
+        if response.status_code == 200 and not kwargs.get('stream'):
+            self.cache.store(url, response.content, response.headers, ttl)
+        return response
+    
+    #Como get, pero sin leer el cuerpo de la respuesta: devuelve (respuesta, BodyStream) para recorrerlo por trozos a medida
+    #que llega. Las páginas vigentes de la caché devuelven su cuerpo en un solo trozo, y las descargadas se guardan en la
+    #caché cuando el BodyStream se ha leído entero. Si la respuesta no es 200 hay que cerrarla (o leer el BodyStream).
+    def get_stream(self, url, ttl = CACHE_TTL_CURRENT, chunk_size = HTTP_STREAM_CHUNK_SIZE, **kwargs):
+        response = self.get(url, ttl, stream = True, **kwargs)
+        on_complete = None
+        if self.cache is not None and response.status_code == 200 and not getattr(response, 'from_cache', False):
+            on_complete = lambda content: self.cache.store(url, content, response.headers, ttl)
+        return response, BodyStream(response, chunk_size, on_complete)
+    
+    #Descarga una URL de la red reintentando los errores de conexión y las respuestas 429/5xx.
+    #Devuelve la última respuesta obtenida (aunque no sea 200) o relanza el último error de conexión.
+    #La respuesta (o el error) lleva en el atributo retries los reintentos que han hecho falta.
+    def fetch(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        limiter = self.rate_limiter.for_url(url) if self.rate_limiter is not None else None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.request(limiter, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if attempt == self.max_retries:
+                    error.retries = attempt
+                    raise
+                time.sleep(self.backoff_delay(attempt))
+                continue
+            
+            if response.status_code not in self.retry_status or attempt == self.max_retries:
+                response.retries = attempt
+                return response
+            
+            #Liberamos la conexión antes de esperar para que vuelva al pool.
+            response.close()
+            time.sleep(self.backoff_delay(attempt, response))
+    
+    #Una sola petición GET, esperando antes el turno del limitador del host y avisándole después del resultado.
+    #Con stream = True el cuerpo se descarga después, así que el hueco de concurrencia se devuelve al cerrar la respuesta.
+    def request(self, limiter, url, **kwargs):
+        if limiter is None:
+            return self.session.get(url, **kwargs)
+        started = limiter.acquire()
+        try:
+            response = self.session.get(url, **kwargs)
+        except BaseException:
+            limiter.release(started, None)
+            raise
+        if not kwargs.get('stream'):
+            limiter.release(started, response.status_code)
+            return response
+        
+        close = response.close
+        released = threading.Lock()
+        def close_and_release():
+            close()
+            if released.acquire(blocking = False):
+                limiter.release(started, response.status_code)
+        response.close = close_and_release
+        return response
+    
+    #Ritmo actual (peticiones por segundo) de cada host, o un diccionario vacío si no hay limitador.
+    def rates(self):
+        return self.rate_limiter.rates() if self.rate_limiter is not None else {}
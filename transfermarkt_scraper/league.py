@@ -0,0 +1,167 @@
+#Scraping por lotes de varios clubes (por ejemplo, una liga entera).
+import pandas as pd
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import multiprocessing
+import re
+
+from .fetch import MAX_WORKERS
+from .metrics import timed
+from .parsing import LEAGUE_SCHEMA, PARSER_BACKEND, PARSER_BACKENDS, apply_schema, parse_marketvalue_page, parse_stats_page
+from .scraper import default_fetcher, fetch_page, forget_blocked_page, merge_season
+from .store import SeasonStore
+from .urls import get_competition_clubs_url, get_team_season_marketvalues_url, get_team_season_stats_url
+
+
+#Los enlaces a un club llevan su nombre en la URL y su código (/real-madrid/startseite/verein/418/saison_id/2023).
+CLUB_LINK_RE = re.compile(r'^/([^/]+)/startseite/verein/(\d+)')
+
+#Extrae la lista de clubes (nombre en la URL, código) de la página de una competición, sin repetidos y en orden.
+def parse_competition_clubs(content, backend = PARSER_BACKEND):
+    backend = PARSER_BACKENDS[backend]
+    clubs = {}
+    for row in backend.rows(content):
+        for tag, _, link in backend.walk(row):
+            match = CLUB_LINK_RE.match(backend.attr(link, 'href') or '') if tag == 'a' else None
+            if match:
+                clubs.setdefault(match.group(2), match.group(1))
+                break
+    return [(team, code) for code, team in clubs.items()]
+
+#Descarga la lista de clubes (nombre en la URL, código) de una competición en una temporada, p. ej. ('laliga', 'ES1', 2024).
+def get_competition_clubs(competition, code, season, fetcher = None, parser_backend = PARSER_BACKEND, rate_limiter = None):
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = default_fetcher(rate_limiter = rate_limiter)
+    url = get_competition_clubs_url(competition, code, season)
+    try:
+        status_code, content = fetch_page(fetcher, url, season)
+    finally:
+        if own_fetcher:
+            fetcher.close()
+    if content is None:
+        raise RuntimeError(f'Error al descargar los clubes de {competition} ({code}) en la temporada {season}: {status_code}')
+    clubs = parse_competition_clubs(content, parser_backend)
+    if not clubs:
+        forget_blocked_page(fetcher, url)
+    return clubs
+
+#Scraping por lotes de varios clubes (por ejemplo, una liga entera) y varias temporadas.
+#Las descargas pasan por un pool de hilos limitado a max_workers (con el Fetcher y la caché de siempre) y el análisis
+#del HTML se reparte en un pool de parse_processes procesos, para que no quede limitado por el GIL (con 0 se analiza en los hilos).
+#Cada (club, temporada) terminado se guarda como punto de control en checkpoint_dir (code=418/season=2010/combined.parquet),
+#así que si la ejecución se interrumpe, al relanzarla solo se scrapea lo que faltaba.
+#Devuelve un único DataFrame con las columnas Team y Code delante de las del scraper.
+#Con un ScrapeMetrics se miden las descargas y las combinaciones (el análisis en otros procesos no se desglosa por etapas).
+#Con un AnalyticsStore en analytics el resultado (incluidos los puntos de control recuperados) se guarda en el almacén analítico.
+#Sin fetcher se crea uno con default_fetcher (cache y rate_limiter se usan para crearlo).
+def scrape_league(clubs, seasons, checkpoint_dir, display = None, max_workers = MAX_WORKERS, parse_processes = None,
+                  fetcher = None, cache = None, parser_backend = PARSER_BACKEND, metrics = None, analytics = None, rate_limiter = None):
+    
+    checkpoints = SeasonStore(checkpoint_dir)
+    clubs = list(clubs)
+    seasons = list(dict.fromkeys(seasons))
+    frames = {}
+    
+    #Recuperamos los (club, temporada) que ya terminaron en una ejecución anterior.
+    pending = []
+    for team, code in clubs:
+        for season in seasons:
+            season_data = checkpoints.load(code, season, 'combined')
+            if season_data is not None:
+                frames[(code, season)] = season_data
+            else:
+                pending.append((team, code, season))
+    if display:
+        display(f'{len(frames)} temporadas recuperadas de los puntos de control, {len(pending)} pendientes.')
+    
+    if pending:
+        own_fetcher = fetcher is None
+        if own_fetcher:
+            fetcher = default_fetcher(max_workers, cache, rate_limiter)
+        rate_limits_before = fetcher.rate_limiter.snapshot() if fetcher.rate_limiter is not None else {}
+        
+        download_pool = ThreadPoolExecutor(max_workers = max(1, max_workers))
+        
+        #Los procesos de análisis se crean con 'spawn': el pool los lanza cuando ya hay hilos de descarga en marcha,
+        #y hacer fork de un proceso con hilos puede dejar bloqueado al hijo.
+        parse_pool = (ProcessPoolExecutor(max_workers = parse_processes, mp_context = multiprocessing.get_context('spawn'))
+                      if parse_processes != 0 else download_pool)
+        try:
+            #Cada página pasa por dos futuros: primero la descarga y después el análisis.
+            futures = {}
+            for team, code, season in pending:
+                for kind, url in (('marketvalue', get_team_season_marketvalues_url(team, code, season)),
+                                  ('stats', get_team_season_stats_url(team, code, season))):
+                    futures[download_pool.submit(fetch_page, fetcher, url, season, metrics, kind)] = ('download', team, code, season, kind, url)
+            
+            #Tablas analizadas de cada (club, temporada) a la espera de su pareja.
+            results = {}
+            parsers = {'marketvalue': parse_marketvalue_page, 'stats': parse_stats_page}
+            
+            while futures:
+                done, _ = wait(futures, return_when = FIRST_COMPLETED)
+                for future in done:
+                    step, team, code, season, kind, url = futures.pop(future)
+                    
+                    #Página descargada: la mandamos al pool de análisis (o la damos por fallida).
+                    if step == 'download':
+                        status_code, content = future.result()
+                        if content is None:
+                            results[(code, season, kind)] = None
+                            if display:
+                                display(f'Error al descargar {team} ({code}), temporada {season}: {status_code}')
+                        else:
+                            futures[parse_pool.submit(parsers[kind], content, season, parser_backend)] = ('parse', team, code, season, kind, url)
+                            continue
+                    
+                    #Página analizada.
+                    else:
+                        try:
+                            results[(code, season, kind)] = future.result()
+                            if results[(code, season, kind)].empty:
+                                forget_blocked_page(fetcher, url)
+                        except Exception as error:
+                            results[(code, season, kind)] = None
+                            if display:
+                                display(f'Error al analizar {team} ({code}), temporada {season}: {error}')
+                    
+                    #Si ya tenemos las dos páginas del (club, temporada), las combinamos y guardamos el punto de control.
+                    if (code, season, 'marketvalue') not in results or (code, season, 'stats') not in results:
+                        continue
+                    marketvalue_df = results.pop((code, season, 'marketvalue'))
+                    stats_df = results.pop((code, season, 'stats'))
+                    if marketvalue_df is None or stats_df is None:
+                        continue
+                    with timed(metrics, 'merge', season):
+                        season_data, report = merge_season(marketvalue_df, stats_df)
+                    
+                    #Una temporada vacía (una página bloqueada o sin jugadores emparejados) no se guarda como punto de control,
+                    #para que la siguiente ejecución la vuelva a pedir.
+                    if marketvalue_df.empty or stats_df.empty or season_data.empty:
+                        if display:
+                            display(f'{team} ({code}), temporada {season}: sin jugadores, se volverá a pedir en la próxima ejecución.')
+                        continue
+                    season_data.insert(0, 'Code', code)
+                    season_data.insert(0, 'Team', team)
+                    checkpoints.save(code, season, 'combined', season_data)
+                    frames[(code, season)] = season_data
+                    if display:
+                        display(f'{team} ({code}), temporada {season}: {report["matched"]} jugadores combinados.')
+        finally:
+            download_pool.shutdown(wait = True, cancel_futures = True)
+            parse_pool.shutdown(wait = True, cancel_futures = True)
+            if metrics is not None and fetcher.rate_limiter is not None:
+                metrics.record_rate_limits(fetcher.rate_limiter.snapshot_since(rate_limits_before))
+            if own_fetcher:
+                fetcher.close()
+    if metrics is not None:
+        metrics.finish()
+    
+    #Unimos todo en el orden de clubes y temporadas pedido.
+    ordered = [frames[(code, season)] for _, code in clubs for season in seasons if (code, season) in frames]
+    if not ordered:
+        return apply_schema(pd.DataFrame(columns = list(LEAGUE_SCHEMA)), LEAGUE_SCHEMA)
+    league_data = apply_schema(pd.concat(ordered, ignore_index = True), LEAGUE_SCHEMA)
+    if analytics is not None:
+        analytics.write(league_data)
+    return league_data
@@ -0,0 +1,167 @@
+#Métricas de rendimiento del scraping.
+import pandas as pd
+from contextlib import contextmanager, nullcontext
+import io
+import json
+import threading
+import time
+
+
+#Métricas de rendimiento de un scraping: tiempo por etapa y temporada, y contadores de cada página descargada
+#(bytes, código de estado, reintentos, filas analizadas y descartadas) y de cada temporada combinada.
+#Las etapas son 'fetch' (descarga), 'parse' (extracción de la tabla HTML), 'normalise' (normalización y tipos),
+#'merge' (combinación de las dos páginas) y 'render' (gráficos de la aplicación).
+#Las descargas y los análisis corren en varios hilos a la vez, así que su tiempo es acumulado y puede superar al total.
+class ScrapeMetrics:
+    
+    STAGES = ('fetch', 'parse', 'normalise', 'merge', 'render')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.wall_time = None
+        self.timings = {}  #(etapa, temporada o None) -> segundos.
+        self.pages = []
+        self.merges = {}
+        self.counters = {}
+        self.rate_limits = {}
+    
+    #Mide el tiempo del bloque y lo suma a la etapa indicada (de una temporada o de todo el scraping si season es None).
+    @contextmanager
+    def stage(self, name, season = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, season, time.perf_counter() - start)
+    
+    def add_time(self, name, season, seconds):
+        key = (name, None if season is None else str(season))
+        with self.lock:
+            self.timings[key] = self.timings.get(key, 0.0) + seconds
+    
+    #Sustituye el tiempo de una etapa en lugar de sumarlo (p. ej. el de los gráficos, que se redibujan en cada recarga).
+    def set_time(self, name, season, seconds):
+        with self.lock:
+            self.timings[(name, None if season is None else str(season))] = seconds
+    
+    def count(self, name, amount = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    #Anota una página descargada (o servida desde la caché, en cuyo caso no cuenta bytes descargados).
+    #Si sus filas ya se anotaron (al analizarla mientras se descarga, record_rows llega antes), completa esa entrada.
+    def record_page(self, season, kind, url, status, downloaded, retries, from_cache, seconds):
+        page = {'season': str(season), 'kind': kind, 'url': url, 'status': status, 'bytes': downloaded, 'retries': retries,
+                'from_cache': from_cache, 'seconds': seconds}
+        with self.lock:
+            for pending in reversed(self.pages):
+                if pending['season'] == page['season'] and pending['kind'] == kind and pending['url'] is None:
+                    pending.update(page)
+                    return
+            self.pages.append({**page, 'rows_parsed': None, 'rows_skipped': None, 'changed': None})
+    
+    #Anota las filas extraídas de una página, las descartadas por no tener datos y si su tabla ha cambiado respecto
+    #al resultado guardado (False si se ha reutilizado sin normalizar).
+    def record_rows(self, season, kind, parsed, skipped, changed = None):
+        with self.lock:
+            for page in reversed(self.pages):
+                if page['season'] == str(season) and page['kind'] == kind:
+                    page['rows_parsed'] = parsed
+                    page['rows_skipped'] = skipped
+                    page['changed'] = changed
+                    break
+            else:
+                self.pages.append({'season': str(season), 'kind': kind, 'url': None, 'status': None,
+                                   'bytes': 0, 'retries': 0, 'from_cache': None, 'seconds': 0.0,
+                                   'rows_parsed': parsed, 'rows_skipped': skipped, 'changed': changed})
+    
+    #Anota el resumen de merge_season de una temporada.
+    def record_merge(self, season, report):
+        with self.lock:
+            self.merges[str(season)] = dict(report)
+    
+    #Anota el estado final del limitador de cada host (ritmo, concurrencia y bloqueos de esta ejecución, ver RateLimiter.snapshot_since).
+    def record_rate_limits(self, snapshot):
+        with self.lock:
+            self.rate_limits.update(snapshot)
+    
+    #Cierra la medición del tiempo total del scraping.
+    def finish(self):
+        if self.wall_time is None:
+            self.wall_time = time.perf_counter() - self.started
+    
+    #Segundos acumulados de cada etapa, sumando todas las temporadas.
+    def stage_totals(self):
+        totals = dict.fromkeys(self.STAGES, 0.0)
+        with self.lock:
+            for (name, _), seconds in self.timings.items():
+                totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+    
+    #Resumen con los totales del scraping.
+    def summary(self):
+        with self.lock:
+            pages = list(self.pages)
+            merges = list(self.merges.values())
+            counters = dict(self.counters)
+        return {'wall_time': self.wall_time,
+                'pages': len(pages),
+                'bytes_downloaded': sum(page['bytes'] or 0 for page in pages),
+                'cache_hits': sum(1 for page in pages if page['from_cache']),
+                'retries': sum(page['retries'] or 0 for page in pages),
+                'errors': sum(1 for page in pages if page['status'] not in (200, None)),
+                'rows_parsed': sum(page['rows_parsed'] or 0 for page in pages),
+                'rows_skipped': sum(page['rows_skipped'] or 0 for page in pages),
+                'pages_changed': sum(1 for page in pages if page['changed'] is True),
+                'pages_unchanged': sum(1 for page in pages if page['changed'] is False),
+                'rows_matched': sum(merge['matched'] for merge in merges),
+                'rows_dropped': sum(merge['marketvalue_only'] + merge['stats_only'] + merge['missing_id'] for merge in merges),
+                **counters}
+    
+    #Una fila por temporada con el tiempo de cada etapa y los contadores de sus páginas.
+    def seasons_frame(self):
+        with self.lock:
+            timings = dict(self.timings)
+            pages = pd.DataFrame(self.pages, columns = ['season', 'kind', 'url', 'status', 'bytes', 'retries', 'from_cache',
+                                                        'seconds', 'rows_parsed', 'rows_skipped'])
+            merges = pd.DataFrame.from_dict(self.merges, orient = 'index')
+        
+        seasons = pd.DataFrame([{'season': season, 'stage': name, 'seconds': seconds}
+                                for (name, season), seconds in timings.items() if season is not None],
+                               columns = ['season', 'stage', 'seconds'])
+        seasons = seasons.pivot_table(index = 'season', columns = 'stage', values = 'seconds', aggfunc = 'sum')
+        seasons = seasons.reindex(columns = [name for name in self.STAGES if name in seasons.columns])
+        counters = pages.groupby('season')[['bytes', 'retries', 'rows_parsed', 'rows_skipped']].sum()
+        return seasons.join(counters, how = 'outer').join(merges, how = 'outer').rename_axis('season').reset_index()
+    
+    def to_dict(self):
+        with self.lock:
+            timings = [{'stage': name, 'season': season, 'seconds': seconds} for (name, season), seconds in self.timings.items()]
+            pages = [dict(page) for page in self.pages]
+            merges = {season: dict(report) for season, report in self.merges.items()}
+            rate_limits = {host: dict(state) for host, state in self.rate_limits.items()}
+        return {'summary': self.summary(), 'stages': self.stage_totals(), 'timings': timings, 'pages': pages, 'merges': merges,
+                'rate_limits': rate_limits}
+    
+    #Exporta las métricas a JSON. Si se indica path se escriben en ese fichero; siempre se devuelve el texto.
+    def to_json(self, path = None):
+        text = json.dumps(self.to_dict(), indent = 2, default = str)
+        if path is not None:
+            with open(path, 'w', encoding = 'utf-8') as json_file:
+                json_file.write(text)
+        return text
+    
+    #Exporta a CSV la tabla por temporada de seasons_frame. Si se indica path se escribe en ese fichero; siempre se devuelve el texto.
+    def to_csv(self, path = None):
+        buffer = io.StringIO()
+        self.seasons_frame().to_csv(buffer, index = False)
+        text = buffer.getvalue()
+        if path is not None:
+            with open(path, 'w', encoding = 'utf-8', newline = '') as csv_file:
+                csv_file.write(text)
+        return text
+
+#Mide una etapa solo si nos han pasado un objeto de métricas.
+def timed(metrics, name, season = None):
+    return metrics.stage(name, season) if metrics is not None else nullcontext()
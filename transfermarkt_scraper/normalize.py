@@ -0,0 +1,51 @@
+#Normalización de las cantidades en texto de Transfermarkt ('€1.50m', '1,5 mill. €', '-'...) a números.
+import numpy as np
+import pandas as pd
+import re
+
+
+#Función para normalizar tanto los valores de mercado como las estadísticas.
+#Versión de un solo valor, que se mantiene por compatibilidad: el scraper usa normalizar_columna.
+def normalizar_valor(valor):
+    if not valor or valor == '-':
+        return None
+    valor = valor.replace('€', '').strip()  #Eliminar el símbolo de €.
+    if 'm' in valor:
+        return float(valor.replace('m', ''))*1e6  #Convertir la 'm' a millones.
+    elif 'k' in valor:
+        return float(valor.replace('k', ''))*1e3  #Convertir la 'k' a miles.
+    else:
+        return int(valor)  #En otro caso convertimos el valor a entero.
+
+#Multiplicadores de los sufijos de cantidades de Transfermarkt en inglés (.co.uk) y en español (.es), sin puntos finales.
+SUFIJOS_VALOR = {'bn': 1e9, 'mil mill': 1e9, 'm': 1e6, 'mill': 1e6, 'k': 1e3, 'th': 1e3, 'mil': 1e3}
+
+#Una cantidad es un número (con separadores de miles y decimales) seguido opcionalmente de uno de los sufijos anteriores.
+VALOR_RE = re.compile(r'^(?P<numero>[+-]?\d[\d.,]*)\s*(?P<sufijo>bn|mil\s+mill\.?|mill\.?|mil|th\.?|m|k)?$')
+
+#Convierte un texto en número (NaN si no se entiende) según el separador decimal de la página.
+def normalizar_texto(texto, decimal):
+    partes = VALOR_RE.match(str(texto).lower().replace('€', '').replace('\xa0', ' ').strip())
+    if not partes:
+        return np.nan
+    
+    #Quitamos el separador de miles y dejamos el punto como separador decimal.
+    numero = partes['numero'].replace(',' if decimal == '.' else '.', '').replace(decimal, '.')
+    sufijo = ' '.join(partes['sufijo'].rstrip('.').split()) if partes['sufijo'] else None
+    try:
+        return float(numero) * SUFIJOS_VALOR.get(sufijo, 1.0)
+    except ValueError:
+        return np.nan
+
+#Normaliza una columna entera de textos.
+#Una columna de Transfermarkt repite muchísimo los mismos textos ('-', '0', '€1.00m'...), así que la factorizamos
+#(en C), interpretamos cada texto distinto una sola vez con la expresión regular compilada y repartimos después el
+#resultado con un take de NumPy. Con tan pocos textos distintos esto es más rápido que las operaciones de texto de pandas,
+#que tienen un coste fijo de unos milisegundos por columna.
+#decimal indica el separador decimal de la página ('.' en transfermarkt.co.uk y ',' en transfermarkt.es); el otro
+#separador se interpreta como separador de miles. Las celdas vacías, '-' o que no se entienden quedan como NaN.
+def normalizar_columna(valores, decimal = '.'):
+    codigos, textos = pd.factorize(np.asarray(valores, dtype = object))
+    resultado = np.fromiter((normalizar_texto(texto, decimal) for texto in textos), dtype = 'float64', count = len(textos))
+    resultado = np.append(resultado, np.nan)  #El código -1 (celda None) apunta al NaN final.
+    return pd.Series(resultado[codigos], dtype = 'float64')
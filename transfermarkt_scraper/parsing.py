@@ -0,0 +1,391 @@
+#Análisis del HTML de las páginas de Transfermarkt y esquema de tipos de las tablas resultantes.
+#bs4 y lxml solo se importan cuando se usa su backend por primera vez, así importar el paquete es rápido.
+import pandas as pd
+import hashlib
+import importlib.util
+import json
+import re
+
+from .metrics import timed
+from .normalize import normalizar_columna
+
+
+#Textos con los que Transfermarkt marca a los jugadores sin estadísticas en la temporada.
+SKIP_STATS_ROWS = ('No ha sido alineado esta temporada', 'No ha estado en la plantilla esta temporada')
+
+#Localiza en el HTML el inicio de cada tabla de jugadores (table.items) y las etiquetas de tabla para encontrar su cierre.
+ITEMS_TABLE_RE = re.compile(r'<table\b[^>]*\bclass\s*=\s*["\'][^"\']*(?<![\w-])items(?![\w-])', re.IGNORECASE)
+TABLE_TAG_RE = re.compile(r'<(/?)table\b', re.IGNORECASE)
+
+#Devuelve el trozo de HTML de cada table.items (incluidas sus tablas anidadas), para no tener que analizar la página entera.
+def items_table_regions(html):
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors = 'replace')
+    pos = 0
+    while True:
+        match = ITEMS_TABLE_RE.search(html, pos)
+        if not match:
+            return
+        depth = 0
+        for tag in TABLE_TAG_RE.finditer(html, match.start()):
+            depth += -1 if tag.group(1) else 1
+            if depth == 0:
+                pos = html.find('>', tag.end()) + 1 or len(html)
+                yield html[match.start():pos]
+                break
+        else:
+            #Tabla sin cerrar: nos quedamos con el resto del documento.
+            yield html[match.start():]
+            return
+
+#Backend de análisis con lxml (compilado en C). Solo analiza las regiones table.items de la página.
+#También admite el contenido como un iterable de trozos de bytes (el BodyStream de una descarga por trozos): entonces
+#los va pasando a un analizador incremental y devuelve cada fila en cuanto se cierra, sin esperar al resto del documento.
+class LxmlBackend:
+    
+    streaming = True
+    
+    def rows(self, content):
+        if not isinstance(content, (bytes, str)):
+            yield from self.stream_rows(content)
+            return
+        
+        import lxml.html
+        for region in items_table_regions(content):
+            table = lxml.html.fragment_fromstring(region)
+            for row in table.iter('tr'):
+                if {'odd', 'even'} & set(row.get('class', '').split()):
+                    yield row
+    
+    #Filas tr.odd/tr.even de table.items a partir de los trozos del documento, con un HTMLPullParser que solo avisa de las
+    #etiquetas table y tr. Cada fila se devuelve cuando se cierra y, cuando se pide la siguiente, se vacía y se quita del
+    #árbol; las tablas que terminan fuera de una fila también se vacían. Así en memoria solo queda la fila en curso y
+    #el esqueleto del resto de la página, nunca el documento entero ni su árbol.
+    def stream_rows(self, chunks):
+        from lxml import etree
+        import lxml.html
+        #Como en items_table_regions, el documento se lee como UTF-8 (sin encoding, lxml solo lo sabe si hay <meta charset>).
+        parser = etree.HTMLPullParser(events = ('start', 'end'), tag = ('table', 'tr'), encoding = 'utf-8')
+        parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())  #Elementos de lxml.html, con text_content.
+        
+        def events():
+            for chunk in chunks:
+                parser.feed(chunk)
+                yield from parser.read_events()
+            parser.close()
+            yield from parser.read_events()
+        
+        items_depth = 0  #table.items abiertas alrededor del punto actual.
+        tables = []  #Pila de tablas abiertas: True si es una table.items.
+        row_depth = 0  #Profundidad de tr dentro de la fila en curso (las filas llevan tablas anidadas con sus propias tr).
+        for event, element in events():
+            if element.tag == 'tr':
+                if event == 'start':
+                    if row_depth:
+                        row_depth += 1
+                    elif items_depth and {'odd', 'even'} & set(element.get('class', '').split()):
+                        row_depth = 1
+                elif row_depth:
+                    row_depth -= 1
+                    if row_depth == 0:
+                        yield element
+                        parent = element.getparent()
+                        element.clear()
+                        if parent is not None:
+                            parent.remove(element)
+            elif event == 'start':
+                is_items = 'items' in element.get('class', '').split()
+                tables.append(is_items)
+                items_depth += is_items
+            else:
+                items_depth -= tables.pop() if tables else False
+                if not row_depth:
+                    element.clear()
+    
+    #Recorre una sola vez los elementos de la fila (sin la propia fila) y devuelve (etiqueta, clases, elemento).
+    def walk(self, row):
+        for element in row.iterdescendants():
+            if isinstance(element.tag, str):
+                yield element.tag, element.get('class', '').split(), element
+    
+    def text(self, element):
+        return element.text_content()
+    
+    def attr(self, element, name):
+        return element.get(name)
+
+#Backend de análisis con BeautifulSoup y html.parser. Con un SoupStrainer solo se construye el árbol de table.items.
+#No analiza por trozos: si recibe los trozos de una descarga, los une antes de analizar.
+class SoupBackend:
+    
+    streaming = False
+    
+    def rows(self, content):
+        from bs4 import BeautifulSoup, SoupStrainer
+        if not isinstance(content, (bytes, str)):
+            content = b''.join(content)
+        soup = BeautifulSoup(content, 'html.parser', parse_only = SoupStrainer('table', class_ = 'items'))
+        return soup.find_all('tr', class_ = ['odd', 'even'])
+    
+    def walk(self, row):
+        from bs4 import Tag
+        for element in row.descendants:
+            if isinstance(element, Tag):
+                yield element.name, element.get('class') or [], element
+    
+    def text(self, element):
+        return element.text
+    
+    def attr(self, element, name):
+        return element.get(name)
+
+#Backends disponibles. Por defecto usamos lxml si está instalado (es opcional) y, si no, BeautifulSoup.
+#Solo comprobamos si lxml está instalado, sin importarlo todavía.
+LXML_AVAILABLE = importlib.util.find_spec('lxml') is not None
+PARSER_BACKENDS = {'bs4': SoupBackend()}
+if LXML_AVAILABLE:
+    PARSER_BACKENDS['lxml'] = LxmlBackend()
+PARSER_BACKEND = 'lxml' if LXML_AVAILABLE else 'bs4'
+
+#Los enlaces a la ficha de un jugador llevan su identificador numérico (/lionel-messi/profil/spieler/28003).
+PLAYER_ID_RE = re.compile(r'/spieler/(\d+)')
+
+#Devuelve el identificador del primer enlace a un jugador dentro de un elemento (o None si no hay ninguno).
+def extract_player_id(backend, element):
+    for tag, _, link in backend.walk(element):
+        if tag == 'a':
+            match = PLAYER_ID_RE.search(backend.attr(link, 'href') or '')
+            if match:
+                return match.group(1)
+    return None
+
+#Extrae en una sola pasada las celdas de una fila de la tabla de valores de mercado.
+def extract_marketvalue_row(backend, row):
+    number = player = position_cell = nationality = market_value = None
+    zentriert = []
+    td_count = 0
+    
+    for tag, classes, element in backend.walk(row):
+        if tag == 'td':
+            td_count += 1
+            if td_count == 2:
+                position_cell = element  #La segunda columna de la tabla (Nombre y Posición).
+            if 'zentriert' in classes:
+                zentriert.append(element)
+            if 'hauptlink' in classes:
+                if player is None:
+                    player = element
+                if market_value is None and 'rechts' in classes:
+                    market_value = element
+        elif tag == 'div' and number is None and 'rn_nummer' in classes:
+            number = element
+        elif tag == 'img' and nationality is None and 'flaggenrahmen' in classes:
+            nationality = element
+    
+    #Dividimos el texto de la columna por espacios ([Nombre, Posición]) y nos quedamos con la última palabra.
+    position = None
+    if position_cell is not None:
+        position_text = backend.text(position_cell).split()
+        position = position_text[-1] if position_text else None
+    
+    return {'Number': backend.text(number).strip() if number is not None else None,
+            'Player': backend.text(player).strip() if player is not None else None,
+            'Player ID': extract_player_id(backend, player) if player is not None else None,
+            'Position': position,
+            'Age': backend.text(zentriert[1]).strip() if len(zentriert) > 1 else None,
+            'Nationality': backend.attr(nationality, 'title') if nationality is not None else None,
+            'Market Value': backend.text(market_value).strip() if market_value is not None else None}
+
+#Extrae en una sola pasada las celdas de una fila de la tabla de estadísticas.
+#Devuelve None si es un jugador que no ha jugado o no ha estado en la plantilla esa temporada.
+def extract_stats_row(backend, row):
+    player = player_id = None
+    zentriert = []
+    
+    for tag, classes, element in backend.walk(row):
+        if tag != 'td':
+            continue
+        if 'zentriert' in classes:
+            text = backend.text(element).strip()
+            if text in SKIP_STATS_ROWS:
+                return None
+            zentriert.append(text)
+        if player is None and 'hauptlink' in classes:
+            for link_tag, _, link in backend.walk(element):
+                if link_tag == 'a' and backend.attr(link, 'title') is not None:
+                    player = backend.text(link).strip()
+                    match = PLAYER_ID_RE.search(backend.attr(link, 'href') or '')
+                    player_id = match.group(1) if match else None
+                    break
+    
+    #Columnas de titularidades, goles, asistencias, amarillas, segunda amarilla y rojas.
+    cells = [zentriert[i] if i < len(zentriert) else None for i in range(4, 10)]
+    return {'Player': player,
+            'Player ID': player_id,
+            'Lineups': cells[0],
+            'Goals': cells[1],
+            'Assists': cells[2],
+            'Yellow Cards': cells[3],
+            'Second Card': cells[4],
+            'Red Cards': cells[5]}
+
+#Columnas en bruto de cada tabla, en el orden en que aparecen en el DataFrame.
+MARKETVALUE_FIELDS = ['Number', 'Player', 'Player ID', 'Position', 'Age', 'Nationality', 'Market Value']
+STATS_FIELDS = ['Player', 'Player ID', 'Lineups', 'Goals', 'Assists', 'Yellow Cards', 'Second Card', 'Red Cards']
+
+#Recorre las filas de una página acumulando el texto en bruto de cada campo por columnas (una lista por campo).
+#content es el HTML de la página o los trozos de una descarga en curso (ver LxmlBackend.stream_rows).
+#Devuelve las columnas y el número de filas descartadas (las de jugadores que no han jugado).
+def extract_columns(backend, content, extract_row, fields):
+    columns = {field: [] for field in fields}
+    skipped = 0
+    for row in backend.rows(content):
+        cells = extract_row(backend, row)
+        if cells is None:
+            skipped += 1
+            continue
+        for field in fields:
+            columns[field].append(cells[field])
+    return columns, skipped
+
+#Versión de la huella de las tablas: hay que subirla si cambia la normalización o el esquema, para que no se reutilicen
+#tablas guardadas que se normalizaron de otra forma.
+FINGERPRINT_VERSION = 1
+
+#Huella de la tabla extraída de una página: SHA-256 del texto en bruto de sus celdas, columna a columna.
+#Solo depende de los datos de la tabla (no del resto del HTML, con anuncios o enlaces que cambian en cada visita).
+def table_fingerprint(columns):
+    payload = json.dumps([FINGERPRINT_VERSION, columns], ensure_ascii = False, separators = (',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+#Anota la huella de una página analizada y comprueba si es la misma que la del resultado anterior (previous, el DataFrame
+#guardado de esa página). Devuelve (huella, cambiada); sin resultado anterior la página cuenta como cambiada.
+def check_fingerprint(columns, previous):
+    fingerprint = table_fingerprint(columns)
+    return fingerprint, previous is None or previous.attrs.get('fingerprint') != fingerprint
+
+#Huella del HTML en bruto de las tablas de jugadores (los trozos de items_table_regions), sin construir ningún árbol.
+def source_fingerprint(content):
+    digest = hashlib.sha256(str(FINGERPRINT_VERSION).encode('utf-8'))
+    for region in items_table_regions(content):
+        digest.update(region.encode('utf-8'))
+    return digest.hexdigest()
+
+#Comprueba antes de analizar si el HTML de las tablas es el mismo que el de previous (una respuesta 304, una copia de la
+#caché o una descarga idéntica): en ese caso no hace falta ni construir el árbol. Devuelve (huella, sin cambios).
+#Los trozos de una descarga en curso se analizan a medida que llegan, así que para ellos no hay huella (None) y solo
+#se compara después la de las celdas (check_fingerprint).
+def check_source(content, previous):
+    if not isinstance(content, (bytes, str)):
+        return None, False
+    fingerprint = source_fingerprint(content)
+    return fingerprint, previous is not None and previous.attrs.get('source_fingerprint') == fingerprint
+
+#Esquema fijo de las tablas: categóricas para los textos que se repiten mucho, enteros nullable estrechos
+#para los conteos y la edad, y float64 para el valor de mercado (que llega a miles de millones).
+#None deja la columna con el tipo de texto por defecto de pandas (el nombre del jugador casi nunca se repite).
+MARKETVALUE_SCHEMA = {'Season': 'category',
+                      'Number': 'Int16',
+                      'Player': None,
+                      'Player ID': 'Int32',  #Los identificadores de Transfermarkt pasan de un millón.
+                      'Position': 'category',
+                      'Age': 'Int16',
+                      'Nationality': 'category',
+                      'Market Value': 'float64'}
+STATS_SCHEMA = {'Season': 'category',
+                'Player': None,
+                'Player ID': 'Int32',
+                'Lineups': 'Int16',
+                'Goals': 'Int16',
+                'Assists': 'Int16',
+                'Yellow Cards': 'Int16',
+                'Second Card': 'Int16',
+                'Red Cards': 'Int16'}
+COMBINED_SCHEMA = {**MARKETVALUE_SCHEMA, **STATS_SCHEMA}
+LEAGUE_SCHEMA = {'Team': 'category', 'Code': 'category', **COMBINED_SCHEMA}
+
+#Convierte las columnas de un DataFrame a los tipos del esquema (las que no estén en el esquema no se tocan).
+def apply_schema(df, schema = COMBINED_SCHEMA):
+    typed = {}
+    for column, dtype in schema.items():
+        if dtype is None or column not in df or df[column].dtype == dtype:
+            continue
+        values = df[column]
+        
+        #Los enteros nullable no admiten decimales: redondeamos por si llega algún valor como '1,0'.
+        if dtype.startswith('Int'):
+            values = pd.to_numeric(values, errors = 'coerce').round()
+        typed[column] = values.astype(dtype)
+    return df.assign(**typed) if typed else df
+
+#Extrae los valores de mercado de la página de plantilla de una temporada.
+#Devuelve un DataFrame con una fila por jugador, con las columnas numéricas normalizadas y los tipos del esquema.
+#Con un ScrapeMetrics se miden las etapas 'parse' y 'normalise' y se anotan las filas extraídas.
+#Las huellas del HTML de la tabla y de sus celdas quedan en attrs['source_fingerprint'] y attrs['fingerprint']. Si previous
+#(el DataFrame guardado de la misma página) tiene la misma huella del HTML, se devuelve sin analizar la página; si solo
+#coincide la de las celdas, se devuelve sin volver a normalizar.
+def parse_marketvalue_page(content, season, backend = PARSER_BACKEND, metrics = None, previous = None):
+    
+    with timed(metrics, 'parse', season):
+        source, unchanged = check_source(content, previous)
+    if unchanged:
+        if metrics is not None:
+            metrics.record_rows(season, 'marketvalue', len(previous), 0, False)
+        return previous
+    
+    with timed(metrics, 'parse', season):
+        columns, skipped = extract_columns(PARSER_BACKENDS[backend], content, extract_marketvalue_row, MARKETVALUE_FIELDS)
+        fingerprint, changed = check_fingerprint(columns, previous)
+    if metrics is not None:
+        metrics.record_rows(season, 'marketvalue', len(columns['Player']), skipped, changed)
+    if not changed:
+        return previous
+    
+    with timed(metrics, 'normalise', season):
+        
+        #La edad puede venir como 'Jun 5, 1990 (33)': en ese caso nos quedamos con el número entre paréntesis.
+        age = pd.Series(columns['Age'], dtype = object)
+        age = age.str.extract(r'\((\d+)\)', expand = False).fillna(age)
+        
+        marketvalue_df = apply_schema(pd.DataFrame({
+            'Season': str(season),   #Queremos que las temporadas sean una variable categórica para manejarlas mejor más adelante.
+            'Number': normalizar_columna(columns['Number']),
+            'Player': columns['Player'],
+            'Player ID': pd.to_numeric(pd.Series(columns['Player ID'], dtype = object)),
+            'Position': pd.Series(columns['Position'], dtype = object),
+            'Age': normalizar_columna(age),
+            'Nationality': pd.Series(columns['Nationality'], dtype = object),
+            'Market Value': normalizar_columna(columns['Market Value'])
+        }), MARKETVALUE_SCHEMA)
+    marketvalue_df.attrs.update(fingerprint = fingerprint, source_fingerprint = source)
+    return marketvalue_df
+
+#Extrae las estadísticas de la página de rendimiento de una temporada (transfermarkt.es, con coma decimal).
+#Devuelve un DataFrame con una fila por jugador, con las columnas numéricas normalizadas y los tipos del esquema.
+#Igual que parse_marketvalue_page, reutiliza previous si la huella del HTML o de las celdas de la tabla no ha cambiado.
+def parse_stats_page(content, season, backend = PARSER_BACKEND, metrics = None, previous = None):
+    
+    with timed(metrics, 'parse', season):
+        source, unchanged = check_source(content, previous)
+    if unchanged:
+        if metrics is not None:
+            metrics.record_rows(season, 'stats', len(previous), 0, False)
+        return previous
+    
+    with timed(metrics, 'parse', season):
+        columns, skipped = extract_columns(PARSER_BACKENDS[backend], content, extract_stats_row, STATS_FIELDS)
+        fingerprint, changed = check_fingerprint(columns, previous)
+    if metrics is not None:
+        metrics.record_rows(season, 'stats', len(columns['Player']), skipped, changed)
+    if not changed:
+        return previous
+    
+    with timed(metrics, 'normalise', season):
+        stats_data = {'Season': str(season),
+                      'Player': columns['Player'],
+                      'Player ID': pd.to_numeric(pd.Series(columns['Player ID'], dtype = object))}
+        for field in STATS_FIELDS[2:]:
+            stats_data[field] = normalizar_columna(columns[field], decimal = ',')
+        stats_df = apply_schema(pd.DataFrame(stats_data), STATS_SCHEMA)
+    stats_df.attrs.update(fingerprint = fingerprint, source_fingerprint = source)
+    return stats_df
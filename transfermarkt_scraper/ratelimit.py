@@ -0,0 +1,127 @@
+#Limitador adaptativo de peticiones por host (token bucket con ajuste AIMD).
+from urllib.parse import urlsplit
+import threading
+import time
+
+
+#Parámetros por defecto del limitador de cada host.
+RATE_INITIAL = 4.0  #Peticiones por segundo al empezar.
+RATE_MIN = 0.2  #Nunca bajamos de una petición cada 5 segundos.
+RATE_MAX = 50.0
+RATE_INCREASE = 1.0  #Aumento aditivo (peticiones/s) por cada segundo de respuestas correctas.
+RATE_DECREASE = 0.5  #Factor por el que se multiplican ritmo y concurrencia al recibir un bloqueo.
+CONCURRENCY_INITIAL = 2
+RATE_BLOCK_STATUS = {403, 429, 500, 502, 503, 504}  #Respuestas que indican que vamos demasiado rápido (o que el host sufre).
+
+#Limitador de un host: un token bucket que se rellena a rate tokens por segundo (con capacidad de un token, así que
+#las peticiones salen espaciadas) y un límite de peticiones simultáneas. Los dos se ajustan con AIMD:
+#- Mientras las respuestas son correctas suben: al principio de forma exponencial (+1 por respuesta, como el slow start
+#  de TCP) y, tras el primer bloqueo, de forma aditiva (unas increase peticiones/s más por cada segundo de respuestas).
+#- Con un 429, 403, 5xx o un error de conexión se multiplican por decrease y el bucket se vacía.
+#  Las respuestas de peticiones que salieron antes del último recorte no recortan otra vez (llegan todas a la vez).
+class HostRateLimiter:
+
+    def __init__(self, rate = RATE_INITIAL, min_rate = RATE_MIN, max_rate = RATE_MAX, increase = RATE_INCREASE,
+                 decrease = RATE_DECREASE, concurrency = CONCURRENCY_INITIAL, max_concurrency = 8,
+                 block_status = RATE_BLOCK_STATUS):
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.concurrency = float(min(concurrency, max_concurrency))
+        self.max_concurrency = max_concurrency
+        self.block_status = set(block_status)
+        self.condition = threading.Condition()
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.last_decrease = float('-inf')
+        self.slow_start = True
+        self.in_flight = 0
+        self.counters = {'requests': 0, 'blocked': 0, 'decreases': 0}
+
+    def _refill(self, now):
+        self.tokens = min(1.0, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    #Espera a tener un token y un hueco de concurrencia. Devuelve el instante de salida, que hay que pasar a release.
+    def acquire(self):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.in_flight < int(self.concurrency):
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        self.in_flight += 1
+                        self.counters['requests'] += 1
+                        return now
+                    self.condition.wait((1.0 - self.tokens) / self.rate)
+                else:
+                    self.condition.wait()
+
+    #Devuelve el hueco de concurrencia y ajusta el ritmo según el resultado (status None si hubo un error de conexión).
+    def release(self, started, status):
+        with self.condition:
+            self.in_flight -= 1
+            if status is None or status in self.block_status:
+                self.counters['blocked'] += 1
+                if started >= self.last_decrease:
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    self.concurrency = max(1.0, self.concurrency * self.decrease)
+                    self.tokens = 0.0
+                    self.updated = time.monotonic()
+                    self.last_decrease = self.updated
+                    self.slow_start = False
+                    self.counters['decreases'] += 1
+            elif self.slow_start:
+                self.rate = min(self.max_rate, self.rate + 1.0)
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1.0)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / self.concurrency)
+            self.condition.notify_all()
+
+    #Estado actual del limitador: ritmo (peticiones/s), límite de concurrencia, peticiones en curso y contadores.
+    def snapshot(self):
+        with self.condition:
+            return {'rate': round(self.rate, 3), 'concurrency': int(self.concurrency), 'in_flight': self.in_flight,
+                    'slow_start': self.slow_start, **self.counters}
+
+#Limitadores de todos los hosts, que se crean con los mismos parámetros la primera vez que se pide una URL de cada host.
+#Así transfermarkt.co.uk y transfermarkt.es tienen cada uno su propio ritmo.
+class RateLimiter:
+
+    def __init__(self, **host_kwargs):
+        self.host_kwargs = host_kwargs
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def for_url(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostRateLimiter(**self.host_kwargs)
+            return self.hosts[host]
+
+    #Ritmo actual de cada host, en peticiones por segundo.
+    def rates(self):
+        with self.lock:
+            hosts = dict(self.hosts)
+        return {host: limiter.snapshot()['rate'] for host, limiter in hosts.items()}
+
+    #Estado completo (ver HostRateLimiter.snapshot) de cada host.
+    def snapshot(self):
+        with self.lock:
+            hosts = dict(self.hosts)
+        return {host: limiter.snapshot() for host, limiter in hosts.items()}
+
+    #Como snapshot, pero con los contadores (peticiones, bloqueos y recortes) desde baseline, un snapshot anterior.
+    #El limitador por defecto se comparte en todo el proceso y sus contadores acumulan todas las ejecuciones: así las métricas
+    #de un scraping cuentan solo lo ocurrido mientras duraba.
+    def snapshot_since(self, baseline):
+        snapshot = self.snapshot()
+        for host, state in snapshot.items():
+            for name in ('requests', 'blocked', 'decreases'):
+                state[name] -= baseline.get(host, {}).get(name, 0)
+        return snapshot
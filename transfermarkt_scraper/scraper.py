@@ -0,0 +1,320 @@
+#Scraping de las temporadas de un equipo: descarga, análisis y combinación de sus dos páginas.
+import pandas as pd
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+
+from .fetch import MAX_WORKERS, Fetcher, random_user_agent, season_ttl
+from .metrics import ScrapeMetrics, timed
+from .parsing import (COMBINED_SCHEMA, MARKETVALUE_SCHEMA, PARSER_BACKEND, PARSER_BACKENDS, STATS_SCHEMA, apply_schema,
+                      parse_marketvalue_page, parse_stats_page)
+from .urls import get_team_season_marketvalues_url, get_team_season_stats_url
+
+
+#Descarga una página con el fetcher compartido y, si la respuesta es correcta, la analiza con el parser indicado.
+#Se ejecuta dentro de los hilos del pool, así el HTML en bruto se libera en cuanto se ha extraído la tabla.
+#Si la descarga falla tras agotar los reintentos, devolvemos el error en lugar del código de estado.
+#previous es el DataFrame guardado de la página: si su tabla no ha cambiado, el parser lo devuelve sin normalizar.
+def fetch_and_parse(fetcher, url, parser, season, backend = PARSER_BACKEND, metrics = None, kind = None, previous = None):
+    status_code, content = fetch_page(fetcher, url, season, metrics, kind)
+    if content is None:
+        return status_code, None
+    return status_code, parser(content, season, backend, metrics, previous)
+
+#Como fetch_and_parse, pero analiza la página mientras se descarga: los trozos del cuerpo pasan al analizador incremental
+#del backend a medida que llegan, así la red y la CPU trabajan a la vez y nunca está en memoria el árbol de la página entera.
+#Es compatible con la caché: una página vigente se analiza desde disco como siempre y una descargada se guarda al terminar.
+#Si la conexión se corta a mitad del cuerpo, la página se vuelve a pedir entera con fetch_and_parse (con sus reintentos).
+def stream_and_parse(fetcher, url, parser, season, backend = PARSER_BACKEND, metrics = None, kind = None, previous = None):
+    start = time.perf_counter()
+    try:
+        request, body = fetcher.get_stream(url, ttl = season_ttl(season))
+    except requests.RequestException as error:
+        if metrics is not None:
+            seconds = time.perf_counter() - start
+            metrics.add_time('fetch', season, seconds)
+            metrics.record_page(season, kind, url, type(error).__name__, 0, getattr(error, 'retries', 0), False, seconds)
+        return error, None
+    headers_seconds = time.perf_counter() - start
+    
+    from_cache = getattr(request, 'from_cache', False)
+    if request.status_code != 200:
+        request.close()
+        page_df = None
+    else:
+        try:
+            page_df = parser(request.content if from_cache else body, season, backend, metrics, previous)
+        except requests.RequestException:
+            body.close()
+            if metrics is not None:
+                metrics.add_time('fetch', season, headers_seconds + body.wait)
+                metrics.add_time('parse', season, -body.wait)
+            return fetch_and_parse(fetcher, url, parser, season, backend, metrics, kind, previous)
+        finally:
+            #Si el parser no ha leído el cuerpo hasta el final, cerramos la respuesta para liberar su hueco del limitador.
+            body.close()
+    
+    #El tiempo de descarga es el de las cabeceras más las esperas a los trozos del cuerpo. Esas esperas ocurren dentro
+    #del análisis, así que se descuentan de su etapa para no contarlas dos veces.
+    if metrics is not None:
+        seconds = headers_seconds + body.wait
+        metrics.add_time('fetch', season, seconds)
+        metrics.add_time('parse', season, -body.wait)
+        metrics.record_page(season, kind, url, request.status_code, body.bytes, getattr(request, 'retries', 0), from_cache, seconds)
+    return request.status_code, page_df
+
+#Descarga una página sin analizarla. Devuelve (código de estado o error, contenido o None si la respuesta no es 200).
+#Con un ScrapeMetrics se anotan el tiempo de descarga, los bytes, el código de estado y los reintentos de la página.
+def fetch_page(fetcher, url, season, metrics = None, kind = None):
+    start = time.perf_counter()
+    try:
+        request = fetcher.get(url, ttl = season_ttl(season))
+    except requests.RequestException as error:
+        if metrics is not None:
+            seconds = time.perf_counter() - start
+            metrics.add_time('fetch', season, seconds)
+            metrics.record_page(season, kind, url, type(error).__name__, 0, getattr(error, 'retries', 0), False, seconds)
+        return error, None
+    
+    if metrics is not None:
+        seconds = time.perf_counter() - start
+        from_cache = getattr(request, 'from_cache', False)
+        metrics.add_time('fetch', season, seconds)
+        metrics.record_page(season, kind, url, request.status_code, 0 if from_cache else len(request.content),
+                            getattr(request, 'retries', 0), from_cache, seconds)
+    if request.status_code != 200:
+        return request.status_code, None
+    return request.status_code, request.content
+
+#Fetcher que crea el scraper cuando no le pasan uno: con un agente de usuario aleatorio para evitar bloqueos, la
+#ResponseCache indicada y el limitador compartido del proceso (o rate_limiter en su lugar; con False se desactiva).
+def default_fetcher(max_workers = MAX_WORKERS, cache = None, rate_limiter = None):
+    return Fetcher(headers = {'User-Agent': random_user_agent()}, pool_maxsize = max(1, max_workers), cache = cache,
+                   rate_limiter = rate_limiter)
+
+#Una página 200 sin tabla (o sin clubes) suele ser un bloqueo o un captcha: la quitamos de la caché HTTP para que la
+#próxima vez se vuelva a pedir en lugar de servirse desde disco durante todo su TTL.
+def forget_blocked_page(fetcher, url):
+    if fetcher.cache is not None:
+        fetcher.cache.invalidate(url)
+
+#Combina las dos tablas de una temporada en una única, por identificador de jugador.
+#Como las dos tablas son de la misma temporada, el índice (Player ID, Season) se reduce a un índice entero por Player ID:
+#así no dependemos de que el nombre se escriba igual en transfermarkt.co.uk y en transfermarkt.es ni confundimos a dos
+#jugadores que se llaman igual. El nombre que se conserva es el de la tabla de valores de mercado.
+#Devuelve el DataFrame combinado y un resumen con las filas emparejadas, las que se han quedado sin pareja
+#y las que se descartan por no tener identificador.
+def merge_season(marketvalue_df, stats_df):
+    missing_id = int(marketvalue_df['Player ID'].isna().sum() + stats_df['Player ID'].isna().sum())
+    marketvalue_df = marketvalue_df[marketvalue_df['Player ID'].notna()]
+    stats_df = stats_df[stats_df['Player ID'].notna()].drop(columns = ['Season', 'Player']).set_index('Player ID')
+    
+    combined_data = marketvalue_df.join(stats_df, on = 'Player ID', how = 'inner').reset_index(drop = True)
+    report = {'matched': len(combined_data),
+              'marketvalue_only': int((~marketvalue_df['Player ID'].isin(stats_df.index)).sum()),
+              'stats_only': int((~stats_df.index.isin(marketvalue_df['Player ID'])).sum()),
+              'missing_id': missing_id}
+    return combined_data, report
+
+#Generador que descarga varias temporadas y devuelve el DataFrame combinado de cada una en cuanto está listo (en cualquier orden).
+def iter_transfermarkt_seasons(team, code, seasons, display = None, max_workers = MAX_WORKERS, fetcher = None, cache = None,
+                               store = None, parser_backend = PARSER_BACKEND, metrics = None, stream = False, rate_limiter = None):
+    
+    #seasons se recorre varias veces, así que admitimos también generadores y range materializándolo.
+    seasons = list(seasons)
+    
+    #Tablas de cada página pendientes de combinar, indexadas por (temporada, tipo de página).
+    #Una temporada sale de aquí en cuanto se combina, así que solo guardamos las que están a medias.
+    results = {}
+    
+    #Tablas guardadas de las páginas caducadas que se vuelven a descargar. Cada página guarda la huella de su tabla
+    #(ver table_fingerprint): si no ha cambiado, el parser devuelve la guardada sin volver a normalizarla.
+    previous = {}
+    
+    #Combina una temporada si ya tenemos sus dos páginas. Si alguna falló, la temporada se descarta (igual que el merge interno).
+    def season_ready(season):
+        if (season, 'marketvalue') not in results or (season, 'stats') not in results:
+            return None
+        marketvalue_df = results.pop((season, 'marketvalue'))
+        stats_df = results.pop((season, 'stats'))
+        if marketvalue_df is None or stats_df is None:
+            return None
+        
+        #Si el almacén tiene la temporada combinada a partir de dos tablas con las mismas huellas, la reutilizamos.
+        fingerprint = None
+        if store is not None and 'fingerprint' in marketvalue_df.attrs and 'fingerprint' in stats_df.attrs:
+            fingerprint = f'{marketvalue_df.attrs["fingerprint"]}:{stats_df.attrs["fingerprint"]}'
+            season_data = store.load(code, season, 'merged')
+            if season_data is not None and season_data.attrs.get('fingerprint') == fingerprint:
+                if metrics is not None:
+                    metrics.record_merge(season, season_data.attrs.get('report', {}))
+                
+                #Solo cuenta como combinación ahorrada si se ha vuelto a descargar alguna de sus páginas.
+                if (season, 'marketvalue') in tasks or (season, 'stats') in tasks:
+                    if metrics is not None:
+                        metrics.count('merges_skipped')
+                    if display:
+                        display(f'Temporada {season} sin cambios: se reutiliza la combinación guardada.')
+                return season_data
+        
+        with timed(metrics, 'merge', season):
+            season_data, report = merge_season(marketvalue_df, stats_df)
+        if fingerprint is not None:
+            season_data.attrs.update(fingerprint = fingerprint, report = report)
+            store.save(code, season, 'merged', season_data)
+        if metrics is not None:
+            metrics.record_merge(season, report)
+        if display:
+            display(f'Temporada {season}: {report["matched"]} jugadores combinados, '
+                    f'{report["marketvalue_only"]} sin estadísticas y {report["stats_only"]} sin valor de mercado.')
+        return season_data
+    
+    #Cada tarea es una página: los valores de mercado (transfermarkt.co.uk) y las estadísticas (transfermarkt.es) de cada temporada.
+    tasks = {}
+    for season in seasons:
+        tasks[(season, 'marketvalue')] = (get_team_season_marketvalues_url(team, code, season), parse_marketvalue_page)
+        tasks[(season, 'stats')] = (get_team_season_stats_url(team, code, season), parse_stats_page)
+    
+    #Con un SeasonStore, recuperamos las páginas que ya tenemos y siguen vigentes, y las quitamos de las tareas pendientes.
+    #Las caducadas se vuelven a descargar, pero guardamos su tabla en previous.
+    if store is not None:
+        for season, kind in list(tasks):
+            age = store.age(code, season, kind)
+            page_df = store.load(code, season, kind) if age is not None else None
+            
+            #Las particiones guardadas con un esquema anterior (sin alguna columna) se vuelven a descargar.
+            schema = MARKETVALUE_SCHEMA if kind == 'marketvalue' else STATS_SCHEMA
+            if page_df is None or not set(schema).issubset(page_df.columns):
+                continue
+            if age >= season_ttl(season):
+                previous[(season, kind)] = page_df
+                continue
+            results[(season, kind)] = page_df
+            del tasks[(season, kind)]
+            if metrics is not None:
+                metrics.count('store_hits')
+            if display:
+                if kind == 'marketvalue':
+                    display(f'Valores de mercado de la temporada {season} recuperados del almacén local.')
+                else:
+                    display(f'Estadísticas de la temporada {season} recuperadas del almacén local.')
+        
+        #Las temporadas completas en el almacén se devuelven sin esperar a la red.
+        for season in dict.fromkeys(seasons):
+            season_data = season_ready(season)
+            if season_data is not None:
+                yield season_data
+    
+    if not tasks:
+        if metrics is not None:
+            metrics.finish()
+        return
+    
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = default_fetcher(max_workers, cache, rate_limiter)
+    rate_limits_before = fetcher.rate_limiter.snapshot() if fetcher.rate_limiter is not None else {}
+    
+    #Todas las páginas se descargan a la vez con un pool de hilos limitado a max_workers. Con stream = True cada página
+    #se analiza mientras se descarga (stream_and_parse), si el backend de PARSER_BACKENDS lo admite ('lxml').
+    download = stream_and_parse if stream and PARSER_BACKENDS[parser_backend].streaming else fetch_and_parse
+    executor = ThreadPoolExecutor(max_workers = max(1, max_workers))
+    try:
+        futures = {executor.submit(download, fetcher, url, parser, season, parser_backend, metrics, kind,
+                                   previous.get((season, kind))): (season, kind)
+                   for (season, kind), (url, parser) in tasks.items()}
+        changed = unchanged = 0
+        
+        #Los mensajes de progreso se lanzan desde el hilo principal (Streamlit no admite llamadas desde otros hilos).
+        for future in as_completed(futures):
+            season, kind = futures[future]
+            status_code, page_df = future.result()
+            if page_df is not None and page_df.empty:
+                forget_blocked_page(fetcher, tasks[(season, kind)][0])
+            
+            #Si no se ha podido actualizar una página caducada (error o bloqueo), usamos la tabla guardada en lugar de
+            #perder la temporada. No se marca como vigente, así que la próxima vez se vuelve a intentar.
+            stale = (season, kind) in previous and (page_df is None or page_df.empty)
+            if stale:
+                page_df = previous[(season, kind)]
+                if metrics is not None:
+                    metrics.count('pages_stale')
+            results[(season, kind)] = page_df
+            
+            #Guardamos en el almacén las páginas nuevas (una página vacía suele indicar un bloqueo, así que no la guardamos).
+            #Una página que no ha cambiado no se reescribe: solo se marca como vigente.
+            if stale:
+                pass
+            elif page_df is not None and page_df is previous.get((season, kind)):
+                unchanged += 1
+                if store is not None:
+                    store.touch(code, season, kind)
+            elif page_df is not None:
+                changed += 1
+                if store is not None and not page_df.empty:
+                    store.save(code, season, kind, page_df)
+            
+            if display:
+                
+                #Control de errores.
+                if stale:
+                    page = 'valores de mercado' if kind == 'marketvalue' else 'estadísticas'
+                    reason = status_code if status_code != 200 else 'página sin tabla'
+                    display(f'No se han podido actualizar las {page} de la temporada {season} ({reason}): '
+                            f'se usan los datos guardados.')
+                elif status_code != 200:
+                    if kind == 'marketvalue':
+                        display(f'Error al descargar valores de mercado para la temporada {season}: {status_code}')
+                    else:
+                        display(f'Error al descargar estadísticas para la temporada {season}: {status_code}')
+                
+                #Muestra el progreso por pantalla en la aplicación de Streamlit.
+                elif kind == 'marketvalue':
+                    display(f'Valores de mercado de la temporada {season} completados.')
+                else:
+                    display(f'Estadísticas de la temporada {season} completadas.')
+            
+            season_data = season_ready(season)
+            if season_data is not None:
+                yield season_data
+        
+        #Con un ScrapeMetrics estos recuentos quedan también en pages_changed, pages_unchanged y merges_skipped.
+        if display and store is not None:
+            display(f'Páginas descargadas: {changed} con cambios y {unchanged} sin cambios (reutilizadas del almacén).')
+    finally:
+        #Si el consumidor deja de iterar, cancelamos las descargas que aún no han empezado.
+        executor.shutdown(wait = True, cancel_futures = True)
+        if metrics is not None and fetcher.rate_limiter is not None:
+            metrics.record_rate_limits(fetcher.rate_limiter.snapshot_since(rate_limits_before))
+        if own_fetcher:
+            fetcher.close()
+        if metrics is not None:
+            metrics.finish()
+
+#Une los DataFrames de cada temporada (indexados por temporada) en el orden de seasons.
+#Una temporada repetida en seasons solo aparece una vez.
+def combine_seasons(season_frames, seasons):
+    frames = [season_frames[str(season)] for season in dict.fromkeys(seasons) if str(season) in season_frames]
+    if not frames:
+        return apply_schema(pd.DataFrame(columns = list(COMBINED_SCHEMA)))
+    
+    #Al unir temporadas con categorías distintas pandas vuelve a object, así que aplicamos otra vez el esquema.
+    return apply_schema(pd.concat(frames, ignore_index = True))
+
+#Función de scraping genérica para manejar varias temporadas o dos temporadas específicas.
+#Recoge las temporadas de iter_transfermarkt_seasons (admite los mismos parámetros) y las une en el orden pedido,
+#para que el DataFrame final no dependa del orden de llegada.
+#Con return_metrics = True devuelve (DataFrame, ScrapeMetrics) con las métricas de rendimiento del scraping.
+#Con un AnalyticsStore en analytics el resultado se guarda también en el almacén analítico, para consultarlo después sin red.
+def scrape_transfermarkt_data(team, code, seasons, display = None, return_metrics = False, analytics = None, **kwargs):
+    seasons = list(seasons)
+    if return_metrics and kwargs.get('metrics') is None:
+        kwargs['metrics'] = ScrapeMetrics()
+    season_frames = {frame['Season'].iat[0]: frame for frame in iter_transfermarkt_seasons(team, code, seasons, display, **kwargs)
+                     if not frame.empty}
+    combined_data = combine_seasons(season_frames, seasons)
+    if analytics is not None and not combined_data.empty:
+        analytics.write(combined_data, team, code)
+    if return_metrics:
+        return combined_data, kwargs['metrics']
+    return combined_data
@@ -0,0 +1,103 @@
+#Almacenes de temporadas ya analizadas: en disco (Parquet) y en memoria.
+import pandas as pd
+from collections import OrderedDict
+import os
+import threading
+import time
+
+from .fetch import season_ttl
+
+
+#Directorio por defecto del almacén local de temporadas ya analizadas.
+STORE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'transfermarkt-scraper', 'seasons')
+
+#Almacén local en Parquet con las tablas ya extraídas de cada página, particionado por
+#código de equipo, temporada y tipo de página (code=418/season=2010/marketvalue.parquet).
+#Permite que scrape_transfermarkt_data solo descargue y analice las temporadas que faltan o han caducado.
+class SeasonStore:
+    
+    def __init__(self, directory = STORE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok = True)
+    
+    def _path(self, code, season, kind):
+        return os.path.join(self.directory, f'code={code}', f'season={season}', f'{kind}.parquet')
+    
+    #Devuelve el DataFrame guardado de una página o None si no existe (su antigüedad se consulta con age).
+    def load(self, code, season, kind):
+        try:
+            return pd.read_parquet(self._path(code, season, kind))
+        except (OSError, ValueError):
+            return None
+    
+    #Segundos desde que se guardó (o se confirmó con touch) una página, o None si no está guardada.
+    def age(self, code, season, kind):
+        try:
+            return time.time() - os.path.getmtime(self._path(code, season, kind))
+        except OSError:
+            return None
+    
+    #Marca una página guardada como vigente sin reescribirla (cuando se ha vuelto a descargar y no ha cambiado).
+    def touch(self, code, season, kind):
+        try:
+            os.utime(self._path(code, season, kind))
+        except OSError:
+            pass
+    
+    #Guarda el DataFrame de una página, sustituyendo la partición anterior si existía.
+    #Sus attrs (como la huella de la tabla) se guardan con ella y vuelven con load.
+    def save(self, code, season, kind, df):
+        path = self._path(code, season, kind)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'  #Único entre procesos e hilos.
+        df.to_parquet(tmp_path, index = False)
+        os.replace(tmp_path, path)
+
+#Número máximo de temporadas que guarda la caché en memoria (unas 30 filas por temporada, así que ocupan muy poco).
+SEASON_CACHE_MAX_ENTRIES = 256
+
+#Caché en memoria del proceso con el DataFrame combinado de cada temporada, indexada por (equipo, código, temporada).
+#Se comparte entre los dos modos de la aplicación: una temporada scrapeada en un rango no se vuelve a pedir al compararla.
+#Guarda como mucho max_entries temporadas (al superarlo se descarta la usada hace más tiempo) y cada una caduca a los
+#ttl segundos; sin ttl se usa el de season_ttl, para que la temporada en curso se refresque antes que las cerradas.
+class SeasonFrameCache:
+    
+    def __init__(self, max_entries = SEASON_CACHE_MAX_ENTRIES, ttl = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  #(equipo, código, temporada) -> (instante de caducidad, DataFrame).
+    
+    def _key(self, team, code, season):
+        return (team, str(code), str(season))
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    #Devuelve el DataFrame de una temporada o None si no está o ha caducado. Marca la entrada como usada.
+    def get(self, team, code, season):
+        key = self._key(team, code, season)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, season_data = entry
+            if time.time() >= expires:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return season_data
+    
+    #Guarda el DataFrame de una temporada y descarta las menos usadas si se supera max_entries.
+    def put(self, team, code, season, season_data):
+        key = self._key(team, code, season)
+        ttl = self.ttl if self.ttl is not None else season_ttl(season)
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, season_data)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last = False)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
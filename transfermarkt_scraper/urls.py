@@ -0,0 +1,18 @@
+#URLs de las páginas de Transfermarkt que descarga el scraper.
+
+
+#Dominios de Transfermarkt de los que sacamos cada página (se pueden sustituir, p. ej. por un servidor local en los benchmarks).
+MARKETVALUES_HOST = 'https://www.transfermarkt.co.uk'
+STATS_HOST = 'https://www.transfermarkt.es'
+
+#Genera la URL para los valores de mercado de un equipo y temporada específicos en Transfermarkt.
+def get_team_season_marketvalues_url(team, code, season):
+    return f'{MARKETVALUES_HOST}/{team}/kader/verein/{code}/plus/0/galerie/0?saison_id={season}'
+
+#Genera la URL para las estadísticas generales de un equipo y temporada específicos en Transfermarkt.
+def get_team_season_stats_url(team, code, season):
+    return f'{STATS_HOST}/{team}/leistungsdaten/verein/{code}/plus/1?reldata=%26{season}'
+
+#Genera la URL de la página de una competición en Transfermarkt, con la lista de clubes de una temporada.
+def get_competition_clubs_url(competition, code, season):
+    return f'{MARKETVALUES_HOST}/{competition}/startseite/wettbewerb/{code}/plus/?saison_id={season}'